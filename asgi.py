@@ -0,0 +1,244 @@
+import asyncio
+from urllib.parse import parse_qs
+
+try:
+    from pymysql.err import MySQLError
+    import aiomysql  # noqa: F401
+except ImportError:
+    raise ImportError("The async API server needs aiomysql: pip install -r requirements-async.txt")
+
+from async_lookup import AsyncPool, fetch_website_bundle, poll_changes, stream_website_bundles
+from compression import StreamCompressor, choose_encoding, compress
+from config import Config
+from lookup import LookupChangeFeed, cached_website_id, invalidate_websites, parse_fields, project_bundle
+from response_cache import ResponseCache, api_envelope, create_backend, make_entry
+from serialization import json_functions
+
+# Asyncio (ASGI) serving mode for the lookup endpoints of api.py: /api, /api/batch and
+# /health, with the same responses. Run with e.g. `uvicorn asgi:app --workers 4`.
+
+DB_CONFIG = {
+    'host': Config.DB_HOST,
+    'port': Config.DB_PORT,
+    'database': Config.DB_NAME,
+    'user': Config.DB_USER,
+    'password': Config.DB_PASSWORD,
+}
+
+# A single /api lookup uses up to eight connections at once (website row plus seven
+# child tables), so size the pool for concurrent requests * 8
+db_pool = AsyncPool(
+    DB_CONFIG,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+    timeout=Config.DB_POOL_TIMEOUT,
+    recycle=Config.DB_POOL_RECYCLE
+)
+
+response_cache = ResponseCache(create_backend(
+    Config.RESPONSE_CACHE_BACKEND,
+    url=Config.RESPONSE_CACHE_URL,
+    ttl=Config.RESPONSE_CACHE_TTL,
+    maxsize=Config.RESPONSE_CACHE_MAXSIZE
+))
+
+# Websites changed by `flask ingest` are dropped from response_cache and the resolver
+change_feed = LookupChangeFeed(interval=Config.CHANGE_POLL_INTERVAL)
+
+MAX_BATCH_SIZE = Config.API_BATCH_MAX_SIZE
+BATCH_CHUNK_SIZE = Config.API_BATCH_CHUNK_SIZE
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+
+# current_app.json.dumps and jsonify() bodies of the Flask app, so both servers return
+# identical bodies
+dumps, json_body, loads = json_functions(Config.JSON_SERIALIZER)
+
+COMPRESSION = {'gzip_level': Config.COMPRESSION_GZIP_LEVEL, 'brotli_quality': Config.COMPRESSION_BROTLI_QUALITY}
+
+
+def negotiate(headers, etag=None):
+    # -> (encoding or None, etag of that variant), as compression.Compression does for Flask
+    encoding = choose_encoding(headers.get(b'accept-encoding', b'').decode('latin-1')) \
+        if Config.COMPRESSION_ENABLED else None
+    return encoding, (f'{etag}-{encoding}' if etag and encoding else etag)
+
+
+async def send_response(send, status, body, content_type='application/json', headers=(), encoding=None):
+    extra = []
+    if Config.COMPRESSION_ENABLED and status == 200 and content_type == 'application/json':
+        extra.append((b'vary', b'Accept-Encoding'))
+        if encoding and len(body) >= Config.COMPRESSION_MIN_SIZE:
+            body = compress(body, encoding, **COMPRESSION)
+            extra.append((b'content-encoding', encoding.encode()))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+                   + CORS_HEADERS + extra + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_error(send, status, message, **extra):
+    await send_response(send, status, json_body({"status": "error", "message": message, "code": status, **extra}))
+
+
+def _etag_matches(headers, etag):
+    value = headers.get(b'if-none-match', b'').decode('latin-1')
+    tags = [tag.strip() for tag in value.split(',') if tag.strip()]
+    return '*' in tags or any(tag.removeprefix('W/').strip('"') == etag for tag in tags)
+
+
+async def send_not_modified(send, etag):
+    await send({'type': 'http.response.start', 'status': 304,
+                'headers': [(b'etag', f'"{etag}"'.encode())] + CORS_HEADERS})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def send_conditional(send, headers, body, etag):
+    # Strong ETag; a matching If-None-Match gets an empty 304. Compressed bodies carry a
+    # per-encoding ETag, as in the Flask app.
+    if _etag_matches(headers, etag):
+        return await send_not_modified(send, etag)
+    encoding, variant = negotiate(headers, etag)
+    if encoding and len(body) < Config.COMPRESSION_MIN_SIZE:
+        encoding, variant = None, etag
+    if variant != etag and _etag_matches(headers, variant):
+        return await send_not_modified(send, variant)
+    await send_response(send, 200, body, headers=[(b'etag', f'"{variant}"'.encode())], encoding=encoding)
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_SIZE:
+            return None
+        if not message.get('more_body'):
+            return body
+
+
+async def api_search(scope, receive, send, headers):
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    website_name = (query.get('name') or [None])[0]
+    fields = parse_fields((query.get('fields') or [None])[0])
+    if not website_name:
+        return await send_error(send, 400, "Website name parameter is required. Use ?name=website.com")
+
+    # Input already resolved and its bundle cached: answer without touching the database
+    website_id = cached_website_id(website_name)
+    entry = response_cache.get(f'api:{website_id}') if website_id is not None else None
+    if entry is None:
+        try:
+            # Canonical host lookup, then the website and its child tables concurrently
+            result = await fetch_website_bundle(db_pool, website_name)
+        except asyncio.TimeoutError:
+            return await send_error(send, 500, "Database connection failed")
+        except MySQLError as e:
+            return await send_error(send, 500, f"Database error: {str(e)}")
+        if not result:
+            return await send_error(send, 404, f"No website found with name: {website_name}", search_term=website_name)
+        entry = response_cache.set(f"api:{result['id']}", dumps(result))
+        if fields:
+            entry = make_entry(dumps(project_bundle(result, fields)))
+    elif fields:
+        entry = make_entry(dumps(project_bundle(loads(entry[0]), fields)))
+    await send_conditional(send, headers, *api_envelope(website_name, entry, dumps))
+
+
+async def api_batch(scope, receive, send, headers):
+    # Accepts a JSON list of names/urls, or {"names": [...], "urls": [...]}
+    body = await read_body(receive)
+    if body is None:
+        return await send_error(send, 413, "Request body is too large")
+    try:
+        payload = loads(body) if body else None
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        names, urls = payload.get('names') or [], payload.get('urls') or []
+        terms = names + urls if isinstance(names, list) and isinstance(urls, list) else None
+    else:
+        terms = payload
+
+    if not terms or not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+        return await send_error(
+            send, 400, "Request body must be a JSON list of website names, or {\"names\": [...]}"
+        )
+    terms = [t.strip() for t in terms if t.strip()]
+    if len(terms) > MAX_BATCH_SIZE:
+        return await send_error(send, 400, f"At most {MAX_BATCH_SIZE} names are allowed per batch")
+
+    # Streamed chunk by chunk, like the Flask endpoint, compressed as it goes when negotiated
+    encoding, _ = negotiate(headers)
+    extra = [(b'vary', b'Accept-Encoding')] if Config.COMPRESSION_ENABLED else []
+    extra += [(b'content-encoding', encoding.encode())] if encoding else []
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/json')] + CORS_HEADERS + extra,
+    })
+    fields = parse_fields((parse_qs(scope['query_string'].decode('latin-1')).get('fields') or [None])[0])
+    compressor = StreamCompressor(encoding, **COMPRESSION) if encoding else None
+    async for part in stream_website_bundles(db_pool, terms, dumps, (MySQLError, asyncio.TimeoutError),
+                                             chunk_size=BATCH_CHUNK_SIZE, fields=fields):
+        data = compressor.compress(part) if compressor else part.encode()
+        await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': compressor.finish() if compressor else b''})
+
+
+async def health_check(scope, receive, send, headers):
+    await send_response(send, 200, json_body({"status": "healthy", "message": "API is running", "pool": db_pool.stats()}))
+
+
+ROUTES = {
+    '/api': {'GET': api_search},
+    '/api/batch': {'POST': api_batch},
+    '/health': {'GET': health_check},
+}
+
+
+async def follow_changes():
+    try:
+        invalidate_websites(response_cache, await poll_changes(change_feed, db_pool))
+    except (MySQLError, asyncio.TimeoutError) as e:
+        # website_changes doesn't exist until `flask db upgrade`
+        print(f"Error reading website changes: {e}")
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await db_pool.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    methods = ROUTES.get(scope['path'].rstrip('/') or '/')
+    if methods is None:
+        return await send_error(send, 404, "Not found")
+    if scope['method'] == 'OPTIONS':
+        # CORS preflight
+        allow = ', '.join(list(methods) + ['OPTIONS']).encode()
+        return await send_response(send, 200, b'', 'text/plain', [
+            (b'access-control-allow-methods', allow), (b'access-control-allow-headers', b'*'), (b'allow', allow)
+        ])
+    handler = methods.get(scope['method'])
+    if handler is None:
+        return await send_error(send, 405, "Method not allowed")
+    headers = dict(scope['headers'])
+    await follow_changes()
+    await handler(scope, receive, send, headers)
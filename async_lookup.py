@@ -0,0 +1,132 @@
+import asyncio
+from collections import OrderedDict
+
+from lookup import (assemble_bundles, bundle_statements, bundles_by_term, cached_ids, match_rows, project_bundle,
+                    remember_ids, resolve_query)
+
+# asyncio counterparts of lookup.py for the ASGI server (asgi.py). Same statements and
+# result shapes; each statement runs on its own pooled connection so the website row and
+# the seven child tables are fetched concurrently.
+
+
+class AsyncPool:
+    # aiomysql pool with the same knobs and stats() shape as db_pool.ConnectionPool
+
+    def __init__(self, db_config, pool_size=5, max_overflow=10, timeout=30, recycle=3600):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        import aiomysql
+
+        async with self._lock:
+            if self._pool is None:
+                config = dict(self.db_config)
+                config.pop('ssl_disabled', None)  # mysql.connector-only option
+                self._pool = await aiomysql.create_pool(
+                    minsize=0, maxsize=self.pool_size + self.max_overflow, pool_recycle=self.recycle,
+                    autocommit=True, cursorclass=aiomysql.DictCursor, db=config.pop('database', None), **config
+                )
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    async def fetchall(self, sql, params=()):
+        pool = self._pool or await self.start()
+        conn = await asyncio.wait_for(pool.acquire(), self.timeout)
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchall()
+        finally:
+            pool.release(conn)
+
+    def stats(self):
+        size, idle = (self._pool.size, self._pool.freesize) if self._pool is not None else (0, 0)
+        return {
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'timeout': self.timeout,
+            'recycle': self.recycle,
+            'open': size,
+            'idle': idle,
+            'checked_out': size - idle,
+            'overflow': max(size - self.pool_size, 0),
+        }
+
+
+async def poll_changes(feed, pool):
+    # LookupChangeFeed.poll over the AsyncPool -> [website_id] changed since the previous poll
+    if not feed.due():
+        return []
+    latest = (await pool.fetchall(feed.LATEST_SQL))[0]['id'] or 0
+    if feed.last_id is None:
+        feed.last_id = latest
+    website_ids = []
+    while latest > feed.last_id:
+        rows = await pool.fetchall(feed.CHANGES_SQL, (feed.last_id, feed.batch_size))
+        if not rows:
+            break
+        website_ids += [row['website_id'] for row in rows]
+        feed.last_id = rows[-1]['id']
+    return website_ids
+
+
+async def resolve_website_ids(pool, terms):
+    terms = list(OrderedDict.fromkeys(terms))
+    resolved, pending = cached_ids(terms)
+    if pending:
+        keys, sql, params = resolve_query(pending)
+        found = match_rows(keys, await pool.fetchall(sql, params))
+        remember_ids(found)
+        resolved.update(found)
+    return {term: resolved.get(term) for term in terms}
+
+
+async def fetch_bundles(pool, website_ids):
+    website_ids = list(OrderedDict.fromkeys(website_ids))
+    if not website_ids:
+        return {}
+    results = await asyncio.gather(*[pool.fetchall(sql, params) for sql, params in bundle_statements(website_ids)])
+    return assemble_bundles(list(results))
+
+
+async def fetch_website_bundles(pool, terms):
+    website_ids = await resolve_website_ids(pool, terms)
+    bundles = await fetch_bundles(pool, [i for i in website_ids.values() if i is not None])
+    return bundles_by_term(website_ids, bundles)
+
+
+async def fetch_website_bundle(pool, term):
+    return (await fetch_website_bundles(pool, [term])).get(term)
+
+
+async def stream_website_bundles(pool, terms, dumps, errors, chunk_size=200, fields=None):
+    # Same document as lookup.stream_website_bundles, produced chunk by chunk
+    yield '{"code": 200, "count": %d, "data": [' % len(terms)
+    index = 0
+    try:
+        for start in range(0, len(terms), chunk_size):
+            chunk = terms[start:start + chunk_size]
+            bundles = await fetch_website_bundles(pool, chunk)
+            parts = []
+            for term in chunk:
+                bundle = bundles.get(term)
+                data = project_bundle(bundle, fields) if fields and bundle else bundle
+                item = {"search_term": term, "found": bundle is not None, "data": data}
+                parts.append((', ' if index else '') + dumps(item))
+                index += 1
+            yield ''.join(parts)
+    except errors as e:
+        yield '], "status": "error", "message": %s}' % dumps(f"Database error: {str(e)}")
+        return
+    yield '], "status": "success"}'
@@ -0,0 +1,259 @@
+# Synthetic catalogue for benchmarks: websites with rows in every child table (and
+# website_countries), drawn from fixed vocabularies so the same --seed and --batch-size
+# always produce the same data. Raw text columns use the formats scraped data has, and
+# are parsed with parsing.parse_raw_columns like ingest does.
+#
+#   python -m bench.catalogue --database sqlite:////tmp/bench.db --websites 100000 [--seed 0]
+#
+# The schema is created with the migrations, so indexes match production.
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+WORDS = ['tech', 'news', 'travel', 'food', 'health', 'money', 'auto', 'home', 'style', 'game', 'sport',
+         'crypto', 'garden', 'pets', 'music', 'film', 'study', 'build', 'beauty', 'daily']
+ZONES = ['com', 'net', 'org', 'io', 'de', 'fr', 'co.uk', 'ru', 'es', 'it']
+LANGUAGES = ['en', 'de', 'fr', 'es', 'ru', 'it', 'pt', 'pl', 'nl', 'tr']
+COUNTRIES = ['United States', 'United Kingdom', 'Germany', 'France', 'Spain', 'Italy', 'India', 'Brazil',
+             'Canada', 'Australia', 'Poland', 'Netherlands', 'Turkey', 'Russia', 'Ukraine', 'Mexico',
+             'Japan', 'Sweden', 'Portugal', 'Austria']
+REGIONS = ['Europe', 'Asia', 'North America', 'Latin America', 'Africa', 'CIS']
+CATEGORIES = ['Business', 'Technology', 'Travel', 'Health', 'Finance', 'Lifestyle', 'Sports', 'Education',
+              'Entertainment', 'Real Estate', 'Automotive', 'Food', 'Fashion', 'Gaming', 'Marketing']
+CONTR_CATEGORIES = ['Casino', 'Crypto', 'Adult', 'Pharma', 'Dating', 'Forex']
+BADGES = [('Top', 'bg-success'), ('New', 'bg-info'), ('Fast', 'bg-warning'), ('Trusted', 'bg-primary')]
+PRICE_FORMATS = [(1, 'Article'), (2, 'Link insertion'), (3, 'Press release')]
+TRAFFIC_SOURCES = ['direct', 'search', 'referral', 'social', 'mail']
+RATINGS = [('Excellent', 'text-success'), ('Good', 'text-info'), ('Average', 'text-warning'), ('Poor', 'text-danger')]
+
+# Child rows per website: (min, max), uniform
+FAN_OUT = {
+    'website_badges': (0, 3),
+    'website_categories': (1, 3),
+    'website_contr_categories': (0, 2),
+    'website_prices': (1, 3),
+    'website_seo_metrics': (1, 1),
+    'website_traffic': (3, 5),
+    'website_traffic_geo': (2, 5),
+}
+
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _money(rng, n):
+    # "$1,200", "150 USD", "€ 99", "1.5K" and the odd unparseable value
+    amounts = np.round(rng.lognormal(4.5, 1.0, n), 0).astype(int)
+    styles = rng.integers(0, 10, n)
+    return [
+        'N/A' if style == 0 else f'${amount:,}' if style < 5 else f'{amount} USD' if style < 8
+        else f'€ {amount}' if style < 9 else f'{amount / 1000:.1f}K'
+        for amount, style in zip(amounts, styles)
+    ]
+
+
+def _count(rng, n, scale):
+    # Heavy-tailed counts written as "12345", "12.3K" or "1.2M"
+    values = rng.pareto(1.2, n) * scale
+    return [f'{v / 1e6:.1f}M' if v >= 1e6 else f'{v / 1e3:.1f}K' if v >= 1e4 else f'{v:.0f}' for v in values]
+
+
+def _repeat(rng, ids, table):
+    low, high = FAN_OUT[table]
+    counts = rng.integers(low, high + 1, len(ids))
+    return np.repeat(ids, counts), counts
+
+
+def _distinct_picks(rng, values, counts):
+    # For each website, `count` different values: the head of a random permutation
+    picks = np.asarray(list(values), dtype=object)[rng.random((len(counts), len(values))).argsort(axis=1)]
+    return [list(row[:count]) for row, count in zip(picks, counts)]
+
+
+def generate_batch(ids, rng):
+    # -> {table name: DataFrame} for one batch of website ids
+    from countries import country_key
+    from domains import website_host_key
+    from parsing import parse_raw_columns
+
+    n = len(ids)
+    names = [f'{word}{website_id}.{zone}' for word, website_id, zone
+             in zip(_pick(rng, WORDS, n), ids, _pick(rng, ZONES, n))]
+    country_counts = rng.integers(1, 4, n)
+    region_counts = rng.integers(0, 3, n)
+    countries = _distinct_picks(rng, COUNTRIES, country_counts)
+    regions = _distinct_picks(rng, REGIONS, region_counts)
+    ratings = rng.integers(0, len(RATINGS), n)
+    websites = pd.DataFrame({
+        'id': ids,
+        'name': names,
+        'url': [f'https://www.{name}/' for name in names],
+        'external_url': [f'https://{name}' for name in names],
+        'placement': 'Article with a dofollow link',
+        'is_free_announcement': rng.random(n) < 0.1,
+        'is_paid_announcement': rng.random(n) < 0.6,
+        'rating_text': [RATINGS[r][0] for r in ratings],
+        'rating_class': [RATINGS[r][1] for r in ratings],
+        'count_review': rng.integers(0, 500, n),
+        'first_moderation_at': '2023-01-15',
+        'protocol': 'https',
+        'domain_age': [f'{years} years' for years in rng.integers(1, 25, n)],
+        'domain_zone': [name.split('.', 1)[1] for name in names],
+        'speed': _pick(rng, ['1 day', '2 days', '3 days', '1 week'], n),
+        'language': _pick(rng, LANGUAGES, n),
+        'countries': [', '.join(c) for c in countries],
+        'regions': [', '.join(r) if r else None for r in regions],
+        'amount_total_deals': [str(d) for d in rng.integers(0, 2000, n)],
+    })
+    websites['host_key'] = [website_host_key(name, url, external_url) for name, url, external_url
+                            in zip(websites['name'], websites['url'], websites['external_url'])]
+
+    tables = {'websites': websites}
+    website_ids = np.repeat(ids, country_counts + region_counts)
+    country_names = [name for c, r in zip(countries, regions) for name in c + r]
+    tables['website_countries'] = pd.DataFrame({
+        'website_id': website_ids,
+        'country_name': country_names,
+        'country_key': [country_key(name) for name in country_names],
+        'kind': [kind for c, r in zip(countries, regions) for kind in ['country'] * len(c) + ['region'] * len(r)],
+    })
+
+    website_ids, counts = _repeat(rng, ids, 'website_badges')
+    badges = rng.integers(0, len(BADGES), len(website_ids))
+    tables['website_badges'] = pd.DataFrame({
+        'website_id': website_ids,
+        'badge_text': [BADGES[b][0] for b in badges],
+        'badge_tooltip': None,
+        'badge_class': [BADGES[b][1] for b in badges],
+    })
+
+    website_ids, counts = _repeat(rng, ids, 'website_categories')
+    categories = [c for picks in _distinct_picks(rng, range(len(CATEGORIES)), counts) for c in picks]
+    tables['website_categories'] = pd.DataFrame({
+        'website_id': website_ids,
+        'category_id': [c + 1 for c in categories],
+        'category_name': [CATEGORIES[c] for c in categories],
+    })
+
+    website_ids, counts = _repeat(rng, ids, 'website_contr_categories')
+    contr = [c for picks in _distinct_picks(rng, range(len(CONTR_CATEGORIES)), counts) for c in picks]
+    tables['website_contr_categories'] = pd.DataFrame({
+        'website_id': website_ids,
+        'contr_id': [c + 1 for c in contr],
+        'contr_name': [CONTR_CATEGORIES[c] for c in contr],
+    })
+
+    website_ids, counts = _repeat(rng, ids, 'website_prices')
+    formats = [f for picks in _distinct_picks(rng, range(len(PRICE_FORMATS)), counts) for f in picks]
+    m = len(website_ids)
+    tables['website_prices'] = pd.DataFrame({
+        'website_id': website_ids,
+        'format_id': [PRICE_FORMATS[f][0] for f in formats],
+        'title': [PRICE_FORMATS[f][1] for f in formats],
+        'price_publication_raw': _money(rng, m),
+        'price_publication_old_raw': [v if keep else None for v, keep in zip(_money(rng, m), rng.random(m) < 0.3)],
+        'publication_with_contr_categories_raw': _money(rng, m),
+        'price_spelling_raw': _money(rng, m),
+        'is_spelling_free': rng.random(m) < 0.2,
+    })
+
+    website_ids, _ = _repeat(rng, ids, 'website_seo_metrics')
+    m = len(website_ids)
+    tables['website_seo_metrics'] = pd.DataFrame({
+        'website_id': website_ids,
+        'ahrefs_rank_raw': _count(rng, m, 1e5),
+        'ahrefs_dr_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'ahrefs_ur_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'ahrefs_backlinks_raw': _count(rng, m, 1e3),
+        'ahrefs_refdomains_raw': _count(rng, m, 1e2),
+        'ahrefs_keywords_raw': _count(rng, m, 1e2),
+        'ahrefs_traffic_raw': _count(rng, m, 1e3),
+        'serpstat_domain_rank_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'serpstat_referring_domains_raw': _count(rng, m, 1e2),
+        'serpstat_referring_links_raw': _count(rng, m, 1e3),
+        'tf_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'cf_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'da_moz_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'majestic_links_raw': _count(rng, m, 1e3),
+        'majestic_ref_domains_raw': _count(rng, m, 1e2),
+        'google_index_raw': _count(rng, m, 1e3),
+        'tr_raw': [str(v) for v in rng.integers(0, 100, m)],
+        'gsc_clicks_raw': _count(rng, m, 1e2),
+        'gsc_impressions_raw': _count(rng, m, 1e3),
+    })
+
+    website_ids, counts = _repeat(rng, ids, 'website_traffic')
+    sources = [s for picks in _distinct_picks(rng, TRAFFIC_SOURCES, counts) for s in picks]
+    tables['website_traffic'] = pd.DataFrame({
+        'website_id': website_ids,
+        'traffic_source': sources,
+        'value_raw': [f'{v:.1f}%' for v in rng.uniform(0, 100, len(website_ids))],
+    })
+
+    website_ids, counts = _repeat(rng, ids, 'website_traffic_geo')
+    geo = [g for picks in _distinct_picks(rng, COUNTRIES, counts) for g in picks]
+    tables['website_traffic_geo'] = pd.DataFrame({
+        'website_id': website_ids,
+        'country_name': geo,
+        'percent_raw': [f'{v:.1f}%' for v in rng.uniform(0, 60, len(website_ids))],
+    })
+
+    for table in tables:
+        parse_raw_columns(tables[table], table)
+    return tables
+
+
+def _records(frame):
+    frame = frame.astype(object)
+    frame = frame.where(frame.notna(), None)
+    columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in frame.itertuples(index=False, name=None)]
+
+
+def seed_catalogue(websites, seed=0, batch_size=5000, echo=print):
+    # Append `websites` synthetic websites after the highest existing id. Needs an app context.
+    from migrations import upgrade
+    from models import db, Website
+
+    upgrade(echo=lambda message: None)
+    with db.engine.connect() as conn:
+        first_id = (conn.execute(db.select(db.func.max(Website.id))).scalar() or 0) + 1
+
+    started, rows = time.perf_counter(), 0
+    for start in range(first_id, first_id + websites, batch_size):
+        ids = np.arange(start, min(start + batch_size, first_id + websites))
+        tables = generate_batch(ids, np.random.default_rng([seed, start]))
+        with db.engine.begin() as conn:
+            for table, frame in tables.items():
+                records = _records(frame)
+                conn.execute(db.metadata.tables[table].insert(), records)
+                rows += len(records)
+        echo(f"{ids[-1] - first_id + 1} websites, {rows} rows ({rows / (time.perf_counter() - started):.0f} rows/s)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database', default='sqlite:////tmp/bench_catalogue.db', help='SQLAlchemy URL')
+    parser.add_argument('--websites', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    # Config reads DATABASE_URL at import
+    os.environ['DATABASE_URL'] = args.database
+    from factory import create_app
+    from rollups import refresh_rollups
+
+    app = create_app(['ui', 'charts'], {'METRICS_ENABLED': False})
+    with app.app_context():
+        seed_catalogue(args.websites, args.seed, args.batch_size)
+        refresh_rollups()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Load test for the lookup endpoints: the same request mix against each server, one after
+# the other, reporting throughput and latency percentiles. Start the servers first, e.g.
+#
+#   gunicorn -w 4 --threads 8 -b :5000 api:app
+#   uvicorn asgi:app --workers 4 --port 5001
+#   python -m bench.load_lookup --names names.txt --concurrency 64 --duration 30 \
+#       http://localhost:5000 http://localhost:5001
+#
+# names.txt holds one website name/url per line. Set RESPONSE_CACHE_BACKEND=null on the
+# servers to measure the database path rather than the response cache.
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+
+async def request(reader, writer, host, method, path, body=b''):
+    writer.write(
+        f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+    )
+    await writer.drain()
+    version, status = (await reader.readline()).split()[:2]
+    length, chunked, keep_alive = None, False, version == b'HTTP/1.1'
+    while True:
+        line = (await reader.readline()).strip()
+        if not line:
+            break
+        name, _, value = line.partition(b':')
+        if name.lower() == b'content-length':
+            length = int(value)
+        elif name.lower() == b'transfer-encoding' and b'chunked' in value.lower():
+            chunked = True
+        elif name.lower() == b'connection':
+            keep_alive = value.strip().lower() == b'keep-alive'
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()  # body runs to the end of the connection
+    return int(status), keep_alive
+
+
+async def client(base, names, batch, deadline, latencies, statuses):
+    # Requests back to back over a keep-alive connection (reopened if the server closes it)
+    url = urlsplit(base)
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            if batch:
+                method, path = 'POST', '/api/batch'
+                body = json.dumps(random.sample(names, min(batch, len(names)))).encode()
+            else:
+                method, path, body = 'GET', f'/api?name={quote(random.choice(names))}', b''
+            started = time.perf_counter()
+            if writer is None:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+            try:
+                status, keep_alive = await request(reader, writer, url.netloc, method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                # Dropped mid-response (e.g. a streamed batch that failed)
+                status, keep_alive = 'dropped', False
+            if not keep_alive:
+                writer.close()
+                writer = None
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run(base, names, concurrency, duration, batch):
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(base, names, batch, started + duration, latencies, statuses) for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0, 0, 0)
+    print(f"{base:<28} {len(ms) / elapsed:>9.1f} req/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   "
+          f"p99 {p99:7.1f} ms   status {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('servers', nargs='+', help='base URLs, e.g. http://localhost:5000')
+    parser.add_argument('--names', required=True, help='file with one website name per line')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--batch', type=int, default=0, help='POST /api/batch with this many names instead')
+    args = parser.parse_args()
+
+    with open(args.names, encoding='utf-8') as handle:
+        names = [line.strip() for line in handle if line.strip()]
+    print(f"{args.concurrency} clients, {args.duration:.0f}s per server, "
+          f"{f'batches of {args.batch}' if args.batch else 'single lookups'} over {len(names)} names")
+    for base in args.servers:
+        asyncio.run(run(base, names, args.concurrency, args.duration, args.batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# Throughput of parsing.parse_numeric against a row-by-row parser on scraped-looking values.
+#
+#   python -m bench.parse_numeric [--values 1000000] [--seed 0]
+import argparse
+import re
+import time
+
+import numpy as np
+
+from parsing import (COMMA_DECIMAL, COMMA_GROUPED, DECORATION, DOT_GROUPED, LETTERS, PLAIN, SPACE_GROUPED, SPACES,
+                     SUFFIX_MULTIPLIERS, WORD_MULTIPLIERS, parse_numeric)
+
+# Fixed inputs both parsers must agree on before anything is timed (None: unparseable)
+EXPECTED = {
+    '$1,200': 1200.0,
+    '100 руб': 100.0,
+    '€ 99': 99.0,
+    '1.2K': 1200.0,
+    '3M': 3e6,
+    '45%': 45.0,
+    '1.234,56': 1234.56,
+    '12,5': 12.5,
+    '1.234.567': 1234567.0,
+    '12 345': 12345.0,
+    'N/A': None,
+    '-': None,
+    '': None,
+    None: None,
+    # Stray letters make a value unparseable instead of joining the digits around them
+    '1e3': None,
+    '1 a 2': None,
+    'k100': None,
+    '5x': None,
+    '12k3': None,
+    # Separators must group in threes; anything else left over is unparseable
+    '1/2': None,
+    '1.2.3': None,
+    '1,23.5': None,
+    '1 2': None,
+    '1 234,56': 1234.56,
+    '1\u00a0234': 1234.0,
+    '1,234.5': 1234.5,
+    # Multiplier words
+    '1.5 млн': 1.5e6,
+    '2 тыс. руб.': 2000.0,
+    '3,5 млрд': 3.5e9,
+    '1.2 bn': 1.2e9,
+}
+
+
+def parse_one(value):
+    # The per-value equivalent of parse_numeric, as it would be written in a loop
+    if value is None:
+        return float('nan')
+    text = re.sub(SPACES, ' ', str(value).lower())
+    multiplier = 1.0
+    for word, factor in WORD_MULTIPLIERS.items():
+        if re.search(f'(?:^|[^{LETTERS}]){word}(?:[^{LETTERS}]|$)', text):
+            multiplier = factor
+    text = re.sub(DECORATION, '', re.sub(f'[{LETTERS}]{{2,}}\\.?', '', text)).strip()
+    multiplier *= SUFFIX_MULTIPLIERS.get(text[-1:], 1.0)
+    text = re.sub(r'[kmb]$', '', text).strip()
+    if re.fullmatch(SPACE_GROUPED, text):
+        text = text.replace(' ', '')
+    if re.fullmatch(PLAIN, text):
+        pass
+    elif re.fullmatch(COMMA_GROUPED, text):
+        text = text.replace(',', '')
+    elif re.fullmatch(DOT_GROUPED, text):
+        text = text.replace('.', '').replace(',', '.')
+    elif re.fullmatch(COMMA_DECIMAL, text):
+        text = text.replace(',', '.')
+    else:
+        return float('nan')
+    return float(text) * multiplier
+
+
+def scraped_values(count, rng):
+    # Mostly distinct numbers in the formats seen in *_raw columns, plus common placeholders
+    amounts = rng.lognormal(5, 3, count)
+    style = rng.integers(0, 8, count)
+    values = []
+    for amount, kind in zip(amounts.tolist(), style.tolist()):
+        if kind == 0:
+            values.append(f'${amount:,.2f}')
+        elif kind == 1:
+            values.append(f'{amount / 1000:.1f}K')
+        elif kind == 2:
+            values.append(f'{amount:.0f}')
+        elif kind == 3:
+            values.append(f'{amount:,.2f} ₽'.replace(',', ' ').replace('.', ','))
+        elif kind == 4:
+            values.append(f'{amount % 100:.2f}%')
+        elif kind == 5:
+            values.append(f'{amount / 1e6:.2f}M')
+        elif kind == 6:
+            values.append(f'{amount:,.0f} руб')
+        else:
+            values.append(rng.choice(['N/A', '-', '', None]))
+    return values
+
+
+def check_expected():
+    # -> [(value, expected, loop result, parse_numeric result)] for every disagreement
+    values = list(EXPECTED)
+    vectorised = parse_numeric(values).tolist()
+    failures = []
+    for value, result in zip(values, vectorised):
+        expected = EXPECTED[value]
+        loop = parse_one(value)
+        for got in (loop, result):
+            if (expected is None and not np.isnan(got)) or (expected is not None and got != expected):
+                failures.append((value, expected, loop, result))
+                break
+    return failures
+
+
+def timed(label, function, values):
+    started = time.perf_counter()
+    result = function(values)
+    seconds = time.perf_counter() - started
+    print(f"{label:<34} {seconds:8.3f}s {len(values) / seconds:14,.0f} values/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parsing.parse_numeric')
+    parser.add_argument('--values', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check_expected()
+    for value, expected, loop, result in failures:
+        print(f"{value!r}: expected {expected}, row-by-row {loop}, parse_numeric {result}")
+    if failures:
+        raise SystemExit(f"{len(failures)} parser checks failed")
+    print(f"{len(EXPECTED)} parser checks passed")
+
+    rng = np.random.default_rng(args.seed)
+    distinct = scraped_values(args.values, rng)
+    # Same size, but drawn from 1% as many strings (prices and placeholders repeat a lot)
+    repeated = [distinct[i] for i in rng.integers(0, max(args.values // 100, 1), args.values)]
+
+    for label, values in (('mostly distinct', distinct), ('repetitive (1% distinct)', repeated)):
+        print(f"{args.values:,} values, {label}")
+        loop = timed('  row-by-row', lambda v: np.array([parse_one(x) for x in v]), values)
+        vectorised = timed('  parse_numeric', lambda v: parse_numeric(v).to_numpy(), values)
+        mismatches = int((~((loop == vectorised) | (np.isnan(loop) & np.isnan(vectorised)))).sum())
+        print(f"  mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
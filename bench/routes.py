@@ -0,0 +1,298 @@
+# Route benchmarks against a synthetic catalogue (bench/catalogue.py), driven through the
+# Flask test client: latency percentiles, SQL statements and DB time per request (from
+# metrics.py), and peak Python memory per request (tracemalloc, measured in a separate pass).
+#
+#   python -m bench.routes --database sqlite:////tmp/bench.db --websites 100000 \
+#       [--requests 200] [--json results.json] [--baseline old.json --tolerance 0.25]
+#
+# The catalogue is seeded first if the database has fewer than --websites websites.
+# Routes in QUERY_BUDGETS fail the run when any request issues more SQL statements than
+# allowed, e.g. an N+1 creeping back into the detail page (python -m bench.routes
+# --only website_detail --requests 50 is a quick check). The hot queries of
+# `flask db check-indexes` are EXPLAINed after seeding and fail the run the same way.
+# With --baseline the run exits non-zero when a route's p95, peak memory or query count
+# regressed against the saved results. Response, facet, leaderboard, rollup and resolver
+# caches are off so every request does the full work. On SQLite the raw-pool /api lookups
+# run their MySQL statements through SQLiteConnection below; pass a mysql+mysqlconnector://
+# URL to measure MySQL itself.
+import argparse
+import json
+import os
+import re
+import sqlite3
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class SQLiteConnection:
+    # The part of the mysql.connector connection API the raw pool and lookup.py use
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._db)
+
+    def is_connected(self):
+        return True
+
+    def ping(self, reconnect=False):
+        pass
+
+    def consume_results(self):
+        pass
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+
+class SQLiteCursor:
+    def __init__(self, db):
+        self._db = db
+        self._rows = []
+        self.statement = None
+
+    def _run(self, operation, params):
+        self.statement = operation
+        cursor = self._db.execute(operation.replace('%s', '?'), params or ())
+        columns = [d[0] for d in cursor.description or ()]
+        self._rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def execute(self, operation, params=None, multi=False):
+        if not multi:
+            self._run(operation, params)
+            return None
+        return self._iter_statements(operation, list(params or ()))
+
+    def _iter_statements(self, operation, params):
+        for statement in operation.split('; '):
+            count = statement.count('%s')
+            self._run(statement, params[:count])
+            params = params[count:]
+            yield self
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        pass
+
+
+# Most SQL statements any single request to these routes may issue, with every cache off
+QUERY_BUDGETS = {
+    # The page, the total count and three facet queries for the filter dropdowns
+    'websites': 5,
+    'websites_filtered': 5,
+    'websites_search': 5,
+    'websites_deep_offset': 5,
+    'websites_deep_cursor': 5,
+    # Answered from the snapshot: the page's websites, the count and the facets
+    'websites_metric_sort': 5,
+    # The website and its seven child tables, eager-loaded (no query per child row)
+    'website_detail': 8,
+    # One streamed SELECT, however many rows
+    'websites_export_csv': 1,
+    # One rollup read per chart
+    'api_seo_metrics': 3,
+    # Resolving the name, then the website and its seven child tables
+    'api_lookup': 9,
+}
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def build_scenarios(app, requests):
+    # (name, [urls], repetitions). URLs are drawn from the seeded data.
+    from models import db, Website
+    from pagination import encode_cursor
+
+    rng = np.random.default_rng(0)
+    with app.app_context():
+        total = db.session.query(db.func.count(Website.id)).scalar()
+        max_id = db.session.query(db.func.max(Website.id)).scalar()
+        sample = [row for row in db.session.query(Website.id, Website.name, Website.language)
+                  .filter(Website.id.in_([int(i) for i in rng.integers(1, max_id + 1, 200)])).all()]
+    ids = [row.id for row in sample]
+    names = [row.name for row in sample]
+    word = re.match(r'[a-z]+', names[0]).group(0)
+    deep_page = max(total // 20 // 2, 1)
+    exports = max(requests // 20, 3)
+    return total, [
+        ('websites', ['/websites'], requests),
+        ('websites_filtered', ['/websites?country=Germany&language=de&category=Finance'], requests),
+        ('websites_search', [f'/websites?search={word}{i}' for i in range(1, 10)], requests),
+        ('websites_deep_offset', [f'/websites?page={deep_page}'], requests),
+        ('websites_deep_cursor', [f'/websites?cursor={encode_cursor("after", max_id // 2)}'], requests),
+        ('websites_metric_sort', ['/websites?min_ahrefs_dr=50&max_price=200&sort=price,-ahrefs_dr',
+                                  '/websites?min_ahrefs_traffic=10000&country=Germany&sort=-ahrefs_dr'], requests),
+        ('website_detail', [f'/website/{i}' for i in ids], requests),
+        ('websites_export_csv', ['/websites/export?export=csv&country=Japan'], exports),
+        ('api_seo_metrics', ['/api/seo_metrics'], requests),
+        ('api_lookup', [f'/api?name={name}' for name in names], requests),
+    ]
+
+
+def run_scenario(client, urls, repetitions, captured):
+    # -> (latencies, statements per request, db seconds per request), after 3 warm-up requests
+    for url in urls[:3]:
+        client.get(url).close()
+    latencies, queries, db_seconds = [], [], []
+    for i in range(repetitions):
+        url = urls[i % len(urls)]
+        captured.clear()
+        started = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        response.close()
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise SystemExit(f"{url} -> {response.status_code}")
+        profile = captured[-1] if captured else None
+        queries.append(profile.queries if profile else 0)
+        db_seconds.append(profile.db_seconds if profile else 0.0)
+    return latencies, queries, db_seconds
+
+
+def peak_memory(client, urls, repetitions):
+    # Largest tracemalloc peak over a few requests, in MB
+    tracemalloc.start()
+    peak = 0
+    try:
+        for i in range(repetitions):
+            tracemalloc.reset_peak()
+            response = client.get(urls[i % len(urls)])
+            response.get_data()
+            response.close()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def compare(results, baseline, tolerance):
+    # -> [regression messages]
+    problems = []
+    for name, result in results['routes'].items():
+        base = baseline.get('routes', {}).get(name)
+        if not base:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p95 {base['p95_ms']:.1f}ms -> {result['p95_ms']:.1f}ms")
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            problems.append(f"{name}: peak memory {base['peak_mb']:.1f}MB -> {result['peak_mb']:.1f}MB")
+        if result['queries'] > base['queries']:
+            problems.append(f"{name}: {base['queries']:g} -> {result['queries']:g} queries per request")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database', default='sqlite:////tmp/bench_catalogue.db', help='SQLAlchemy URL')
+    parser.add_argument('--websites', type=int, default=100000, help='seed up to this many websites')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--memory-requests', type=int, default=5, help='requests per route traced for memory')
+    parser.add_argument('--only', action='append', help='run only these routes (repeatable)')
+    parser.add_argument('--json', help='write the results here')
+    parser.add_argument('--baseline', help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95/memory growth (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    # Config reads the environment at import
+    from sqlalchemy.engine import make_url
+
+    url = make_url(args.database)
+    os.environ['DATABASE_URL'] = args.database
+    if url.get_backend_name() == 'mysql':
+        os.environ.update({'DB_HOST': url.host or 'localhost', 'DB_PORT': str(url.port or 3306),
+                           'DB_NAME': url.database or '', 'DB_USER': url.username or '',
+                           'DB_PASSWORD': url.password or ''})
+
+    from bench.catalogue import seed_catalogue
+    from factory import create_app
+    from models import db, Website
+    from lookup import resolver_cache
+    from rollups import refresh_rollups, rollup_cache
+
+    app = create_app(config={
+        'RESPONSE_CACHE_BACKEND': 'none',
+        'FACET_CACHE_TTL': 0,
+        'LEADERBOARD_CACHE_TTL': 0,
+        'METRICS_ENABLED': True,
+        'SLOW_REQUEST_SECONDS': float('inf'),
+        # Only the first request polls website_changes, so query counts are the route's own
+        'CHANGE_POLL_INTERVAL': 3600,
+    })
+    # The module-level caches have no config setting; ttl 0 stores nothing
+    rollup_cache.ttl = 0
+    resolver_cache.ttl = 0
+    if url.get_backend_name() == 'sqlite':
+        app.extensions['db_pool']._open = lambda: SQLiteConnection(url.database)
+
+    problems = []
+    with app.app_context():
+        from migrations import check_indexes, upgrade
+
+        upgrade(echo=lambda message: None)
+        existing = db.session.query(db.func.count(Website.id)).scalar()
+        if existing < args.websites:
+            print(f"Seeding {args.websites - existing} websites into {args.database}")
+            seed_catalogue(args.websites - existing, args.seed)
+            refresh_rollups()
+        # Same check as `flask db check-indexes`, against the seeded catalogue
+        problems += [f"{description}: not indexed ({problem})" for description, problem in check_indexes()]
+
+    captured = []
+    app.extensions['metrics'].observers.append(lambda endpoint, seconds, profile: captured.append(profile))
+    total, scenarios = build_scenarios(app, args.requests)
+    client = app.test_client()
+
+    results = {'websites': total, 'requests': args.requests, 'database': url.get_backend_name(), 'routes': {}}
+    print(f"{total} websites, {url.get_backend_name()}")
+    print(f"{'route':<22} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'queries':>8} {'db':>8} {'peak mem':>9}")
+    for name, urls, repetitions in scenarios:
+        if args.only and name not in args.only:
+            continue
+        latencies, queries, db_seconds = run_scenario(client, urls, repetitions, captured)
+        ms = [l * 1000 for l in latencies]
+        result = {
+            'n': len(ms),
+            'p50_ms': percentile(ms, 50), 'p95_ms': percentile(ms, 95), 'p99_ms': percentile(ms, 99), 'max_ms': max(ms),
+            'queries': statistics.mean(queries), 'db_ms': statistics.mean(db_seconds) * 1000,
+            'peak_mb': peak_memory(client, urls, min(args.memory_requests, repetitions)),
+        }
+        results['routes'][name] = result
+        if name in QUERY_BUDGETS and max(queries) > QUERY_BUDGETS[name]:
+            problems.append(f"{name}: {max(queries)} queries in one request, budget {QUERY_BUDGETS[name]}")
+        print(f"{name:<22} {result['n']:>5} {result['p50_ms']:>6.1f}ms {result['p95_ms']:>6.1f}ms "
+              f"{result['p99_ms']:>6.1f}ms {result['max_ms']:>6.1f}ms {result['queries']:>8.1f} "
+              f"{result['db_ms']:>6.1f}ms {result['peak_mb']:>7.1f}MB")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            problems += compare(results, json.load(handle), args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        raise SystemExit(1)
+    if args.baseline:
+        print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Bytes and CPU per API response for each JSON serializer, ?fields= projection and
+# compression (identity, gzip, brotli), for the /api bundle of one website and an
+# /api/batch body of --batch websites. Bundles come from a synthetic catalogue
+# (bench/catalogue.py), with Decimal values for the Numeric columns as mysql.connector
+# returns them.
+#
+#   python -m bench.serialization --database sqlite:////tmp/bench.db [--websites 2000] [--samples 200]
+#
+# CPU is process time per response: encoding the body, then compressing it.
+import argparse
+import os
+import time
+
+import numpy as np
+
+PROJECTIONS = {
+    'full': None,
+    'no_raw': '-*_raw,-*tooltip',
+    'summary': 'id,name,url,language,countries,prices.title,prices.price_publication,seo_metrics.ahrefs_*,seo_metrics.da_moz',
+}
+
+
+def load_bundles(website_ids):
+    # The /api bundles of these websites, read through SQLAlchemy so Numeric columns are Decimal
+    from sqlalchemy import select
+
+    from lookup import CHILD_TABLES, assemble_bundles
+    from models import db
+
+    tables = db.metadata.tables
+    results = [db.session.execute(select(tables['websites']).where(tables['websites'].c.id.in_(website_ids)))
+               .mappings().all()]
+    for _, name, _ in CHILD_TABLES:
+        table = tables[name]
+        results.append(db.session.execute(
+            select(table).where(table.c.website_id.in_(website_ids)).order_by(table.c.website_id, table.c.id)
+        ).mappings().all())
+    bundles = assemble_bundles([[dict(row) for row in rows] for rows in results])
+    return [bundles[website_id] for website_id in website_ids if website_id in bundles]
+
+
+def measure(encode, payloads, encoding, config):
+    # -> (mean bytes, mean encode µs, mean compress µs) per payload
+    from compression import compress
+
+    sizes, encode_times, compress_times = [], [], []
+    for payload in payloads:
+        started = time.process_time()
+        body = encode(payload)
+        encoded = time.process_time()
+        if encoding != 'identity':
+            body = compress(body, encoding, config['COMPRESSION_GZIP_LEVEL'], config['COMPRESSION_BROTLI_QUALITY'])
+        compress_times.append(time.process_time() - encoded)
+        encode_times.append(encoded - started)
+        sizes.append(len(body))
+    return np.mean(sizes), np.mean(encode_times) * 1e6, np.mean(compress_times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database', default='sqlite:////tmp/bench_catalogue.db', help='SQLAlchemy URL')
+    parser.add_argument('--websites', type=int, default=2000, help='seed up to this many websites')
+    parser.add_argument('--samples', type=int, default=200, help='single-website bundles to encode')
+    parser.add_argument('--batch', type=int, default=100, help='websites per /api/batch body')
+    parser.add_argument('--repeat', type=int, default=5, help='passes over the samples')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database
+    from bench.catalogue import seed_catalogue
+    from compression import brotli
+    from lookup import parse_fields, project_bundle
+    from models import db, Website
+    from factory import create_app
+    from serialization import json_functions, orjson
+
+    app = create_app(['ui'], {'METRICS_ENABLED': False})
+    with app.app_context():
+        from migrations import upgrade
+
+        upgrade(echo=lambda message: None)
+        existing = db.session.query(db.func.count(Website.id)).scalar()
+        if existing < args.websites:
+            print(f"Seeding {args.websites - existing} websites into {args.database}")
+            seed_catalogue(args.websites - existing, 0)
+        max_id = db.session.query(db.func.max(Website.id)).scalar()
+        website_ids = np.random.default_rng(0).choice(np.arange(1, max_id + 1), args.samples + args.batch,
+                                                      replace=False).tolist()
+        bundles = load_bundles(website_ids)
+
+    serializers = ['stdlib'] + (['orjson'] if orjson else [])
+    encodings = ['identity', 'gzip'] + (['br'] if brotli else [])
+    print(f"{len(bundles)} bundles; gzip level {app.config['COMPRESSION_GZIP_LEVEL']}, "
+          f"brotli quality {app.config['COMPRESSION_BROTLI_QUALITY']}")
+    print(f"{'payload':<8} {'fields':<8} {'serializer':<10} {'encoding':<9} {'bytes':>9} {'encode':>10} {'compress':>10} {'total':>10}")
+    for payload_name in ('api', 'batch'):
+        for projection, spec in PROJECTIONS.items():
+            fields = parse_fields(spec)
+            projected = [project_bundle(bundle, fields) if fields else bundle for bundle in bundles]
+            if payload_name == 'api':
+                payloads = projected[:args.samples] * args.repeat
+            else:
+                batch = [{'search_term': b['name'], 'found': True, 'data': b} for b in projected[-args.batch:]]
+                payloads = [{'code': 200, 'count': len(batch), 'data': batch, 'status': 'success'}] * args.repeat
+            for serializer in serializers:
+                dumps = json_functions(serializer)[0]
+                encode = lambda value: dumps(value).encode('utf-8')
+                for encoding in encodings:
+                    size, encode_us, compress_us = measure(encode, payloads, encoding, app.config)
+                    print(f"{payload_name:<8} {projection:<8} {serializer:<10} {encoding:<9} {size:>9.0f} "
+                          f"{encode_us:>8.0f}µs {compress_us:>8.0f}µs {encode_us + compress_us:>8.0f}µs")
+
+
+if __name__ == '__main__':
+    main()
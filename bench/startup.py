@@ -0,0 +1,53 @@
+# Per-worker startup cost of each deployment: import time and resident memory of a fresh
+# interpreter that has loaded the app, plus which heavy libraries came along with it.
+#
+#   python -m bench.startup [--runs 5] [api:app app:app ...]
+#
+# Each run is a new process, as a freshly forked-and-exec'd gunicorn worker would be.
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'sqlalchemy', 'flask_sqlalchemy', 'mysql.connector']
+
+PROBE = '''
+import importlib, json, sys, time
+started = time.perf_counter()
+if sys.argv[1]:
+    module, _, attr = sys.argv[1].partition(':')
+    getattr(importlib.import_module(module), attr or 'app')
+elapsed = time.perf_counter() - started
+with open('/proc/self/status') as status:
+    rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:')) / 1024
+print(json.dumps({'seconds': elapsed, 'rss': rss, 'loaded': [m for m in %r if m in sys.modules]}))
+''' % HEAVY_MODULES
+
+
+def measure(target, runs):
+    results = [
+        json.loads(subprocess.run([sys.executable, '-c', PROBE, target], capture_output=True, text=True,
+                                  check=True).stdout)
+        for _ in range(runs)
+    ]
+    return (statistics.median(r['seconds'] for r in results), statistics.median(r['rss'] for r in results),
+            results[-1]['loaded'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('targets', nargs='*', default=['api:app', 'app:app'], help='module:attribute to load')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    _, base_rss, _ = measure('', args.runs)
+    print(f"{'target':<12} {'import':>9} {'RSS':>9} {'+ over bare python':>19}   heavy modules loaded")
+    for target in args.targets:
+        seconds, rss, loaded = measure(target, args.runs)
+        print(f"{target:<12} {seconds * 1000:>7.0f}ms {rss:>7.1f}MB {rss - base_rss:>17.1f}MB   "
+              f"{', '.join(loaded) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, WebsiteChange
+
+
+def record_changes(conn, changes):
+    # Append (website_id, change) pairs to website_changes inside the caller's transaction
+    if changes:
+        changed_at = datetime.utcnow()
+        conn.execute(WebsiteChange.__table__.insert(), [
+            {'website_id': website_id, 'change': change, 'changed_at': changed_at} for website_id, change in changes
+        ])
+
+
+def prune_changes(days):
+    # Drop log entries older than `days`; followers only ever need the recent tail
+    table = WebsiteChange.__table__
+    with db.engine.begin() as conn:
+        result = conn.execute(table.delete().where(table.c.changed_at < datetime.utcnow() - timedelta(days=days)))
+    return result.rowcount
+
+
+class ChangeFeed:
+    # Follows website_changes from the newest entry seen at startup, checking at most once
+    # per `interval` seconds. Caches start empty, so older history is never replayed.
+
+    def __init__(self, interval=5, batch_size=5000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_id = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        # -> [(website_id, change)] logged since the previous poll ([] when throttled)
+        if time.monotonic() - self._checked_at < self.interval or not self._lock.acquire(blocking=False):
+            return []
+        try:
+            self._checked_at = time.monotonic()
+            table = WebsiteChange.__table__
+            if self.last_id is None:
+                self.last_id = db.session.execute(select(func.max(table.c.id))).scalar() or 0
+                return []
+            changes = []
+            while True:
+                rows = db.session.execute(
+                    select(table.c.id, table.c.website_id, table.c.change)
+                    .where(table.c.id > self.last_id).order_by(table.c.id).limit(self.batch_size)
+                ).all()
+                changes += [(row.website_id, row.change) for row in rows]
+                if rows:
+                    self.last_id = rows[-1].id
+                if len(rows) < self.batch_size:
+                    return changes
+        except SQLAlchemyError as e:
+            # website_changes doesn't exist until `flask db upgrade`
+            db.session.rollback()
+            print(f"Error reading website changes: {getattr(e, 'orig', e)}")
+            return []
+        finally:
+            self._lock.release()
@@ -0,0 +1,95 @@
+from flask import Blueprint, current_app, render_template, request, jsonify
+
+from leaderboards import DEFAULT_METRICS, SEO_METRICS, get_leaderboard
+from models import WebsiteTraffic, WebsiteTrafficGeo
+from rollups import DISTRIBUTION_BINS, get_rollup, get_top_from_rollup
+
+bp = Blueprint('charts', __name__)
+
+
+@bp.route('/charts')
+def charts():
+    return render_template('charts.html')
+
+@bp.route('/api/seo_metrics')
+def api_seo_metrics():
+    # Top websites by SEO metric. ?metric= (repeatable) picks any numeric column of
+    # website_seo_metrics; the default is the three charted on /charts.
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    metrics = request.args.getlist('metric') or DEFAULT_METRICS
+
+    unknown = [m for m in metrics if m not in SEO_METRICS]
+    if unknown:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown metric: {', '.join(unknown)}. Available: {', '.join(SEO_METRICS)}",
+            "code": 400
+        }), 400
+
+    # Prepare data for charts: precomputed rollup when available, else a cached live query
+    ttl = current_app.config['LEADERBOARD_CACHE_TTL']
+    charts_data = {
+        metric: get_top_from_rollup(metric, limit) or get_leaderboard(metric, limit, ttl)
+        for metric in metrics
+    }
+
+    return jsonify(charts_data)
+
+def rollup_response(name):
+    rollup = get_rollup(name)
+    if rollup is None:
+        return jsonify({
+            "status": "error",
+            "message": "Chart data has not been computed yet. Run `flask refresh-rollups`.",
+            "code": 404
+        }), 404
+    return jsonify(rollup)
+
+@bp.route('/api/charts/distribution/<metric>')
+def api_chart_distribution(metric):
+    # Histogram and percentiles of an SEO metric across all websites
+    if metric not in DISTRIBUTION_BINS:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown metric: {metric}. Available: {', '.join(DISTRIBUTION_BINS)}",
+            "code": 400
+        }), 400
+    return rollup_response(f'distribution:{metric}')
+
+@bp.route('/api/charts/prices')
+def api_chart_prices():
+    # Distribution of publication prices
+    return rollup_response('prices')
+
+@bp.route('/api/charts/country_traffic')
+def api_chart_country_traffic():
+    # Estimated share of catalogue traffic per country
+    return rollup_response('country_traffic')
+
+@bp.route('/api/traffic_sources')
+def api_traffic_sources():
+    # Get traffic sources distribution
+    website_id = request.args.get('website_id', type=int)
+
+    if website_id:
+        traffic_data = WebsiteTraffic.query.filter_by(website_id=website_id).all()
+        return jsonify({
+            'sources': [t.traffic_source for t in traffic_data],
+            'values': [float(t.value_clean) for t in traffic_data if t.value_clean]
+        })
+
+    return jsonify({'error': 'Website ID required'}), 400
+
+@bp.route('/api/geo_distribution')
+def api_geo_distribution():
+    # Get geographical distribution for a website
+    website_id = request.args.get('website_id', type=int)
+
+    if website_id:
+        geo_data = WebsiteTrafficGeo.query.filter_by(website_id=website_id).all()
+        return jsonify({
+            'countries': [g.country_name for g in geo_data],
+            'percentages': [float(g.percent_clean) for g in geo_data if g.percent_clean]
+        })
+
+    return jsonify({'error': 'Website ID required'}), 400
@@ -0,0 +1,115 @@
+import click
+from flask.cli import AppGroup
+
+# `flask` CLI commands. Their modules are imported when a command runs, so web workers
+# don't load ingest/parsing (pandas) just to register them.
+
+
+def register_commands(app):
+    @app.cli.command('refresh-facets')
+    def refresh_facets_command():
+        # Rebuild the website_facets table and drop the cached dropdown values
+        from facets import refresh_facet_table
+
+        facets = refresh_facet_table()
+        print(', '.join(f"{len(values)} {name}" for name, values in facets.items()))
+
+    # Schema migrations: `flask db upgrade`, `flask db status`, `flask db check-indexes`
+    db_cli = AppGroup('db', help='Database schema migrations.')
+    app.cli.add_command(db_cli)
+
+    @db_cli.command('upgrade')
+    def db_upgrade_command():
+        from migrations import upgrade
+
+        ran = upgrade()
+        print(f"Applied {len(ran)} migration(s)" if ran else "Database is up to date")
+
+    @db_cli.command('status')
+    def db_status_command():
+        from migrations import MIGRATIONS, applied_migrations
+
+        applied = applied_migrations()
+        for migration_id, description, _ in MIGRATIONS:
+            print(f"[{'x' if migration_id in applied else ' '}] {migration_id}: {description}")
+
+    @db_cli.command('check-indexes')
+    def db_check_indexes_command():
+        # EXPLAIN the hot lookup/sort queries and fail if any of them lost its index
+        from migrations import check_indexes
+
+        problems = check_indexes()
+        for description, problem in problems:
+            print(f"NOT INDEXED: {description} ({problem})")
+        if problems:
+            raise SystemExit(1)
+        print("All hot queries use an index")
+
+    @app.cli.command('refresh-rollups')
+    def refresh_rollups_command():
+        # Recompute the chart_rollups summary table (run from cron after data loads)
+        from rollups import refresh_rollups
+
+        rollups = refresh_rollups()
+        print(f"Refreshed {len(rollups)} chart rollups")
+
+    @app.cli.command('backfill-countries')
+    def backfill_countries_command():
+        # Populate website_countries from the comma-separated countries/regions columns
+        from countries import backfill_countries
+        from facets import invalidate_facets
+
+        websites, rows = backfill_countries()
+        invalidate_facets()
+        print(f"Indexed {rows} countries/regions for {websites} websites")
+
+    @app.cli.command('ingest')
+    @click.argument('path')
+    @click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='Defaults to the file extension.')
+    @click.option('--batch-size', type=int, help='Websites per transaction (INGEST_BATCH_SIZE).')
+    @click.option('--full', is_flag=True, help='The snapshot is the whole catalogue: delete websites missing from it.')
+    @click.option('--force', is_flag=True, help='Rewrite every website, even if its content hash is unchanged.')
+    def ingest_command(path, fmt, batch_size, full, force):
+        # Load a JSONL/CSV snapshot (`-` for stdin); only changed websites are written and logged
+        from changes import prune_changes
+        from facets import invalidate_facets, refresh_facet_table
+        from ingest import ingest_snapshot
+        from leaderboards import invalidate_leaderboards
+        from lookup import invalidate_resolver
+        from rollups import refresh_rollups
+
+        response_cache = app.extensions['response_cache']
+        stats = ingest_snapshot(
+            path, fmt, batch_size or app.config['INGEST_BATCH_SIZE'], force=force, full=full,
+            on_change=lambda changes: response_cache.invalidate_website(*[website_id for website_id, _ in changes])
+        )
+        if stats['insert'] or stats['update'] or stats['delete']:
+            invalidate_resolver()
+            invalidate_facets()
+            invalidate_leaderboards()
+            if app.config['FACETS_FROM_TABLE']:
+                refresh_facet_table()
+            refresh_rollups()
+        prune_changes(app.config['CHANGE_LOG_RETENTION_DAYS'])
+        print(f"Ingested {stats['websites']} websites in {stats['seconds']:.1f}s: {stats['insert']} new, "
+              f"{stats['update']} updated, {stats['unchanged']} unchanged, {stats['delete']} deleted, "
+              f"{stats['rows']} rows written ({stats['rows'] / max(stats['seconds'], 1e-9):.0f} rows/s)")
+        if stats['skipped']:
+            print(f"Skipped {stats['skipped']} records without an id")
+
+    @app.cli.command('backfill-numeric')
+    @click.option('--chunk-size', default=5000, show_default=True, help='Rows read per transaction.')
+    def backfill_numeric_command(chunk_size):
+        # Recompute the parsed price/SEO/traffic columns from their *_raw text
+        from leaderboards import invalidate_leaderboards
+        from parsing import backfill_parsed_columns
+        from rollups import refresh_rollups
+
+        updated, website_ids = backfill_parsed_columns(chunk_size)
+        if website_ids:
+            app.extensions['response_cache'].invalidate_website(*website_ids)
+            invalidate_leaderboards()
+            refresh_rollups()
+        for table, rows in updated.items():
+            print(f"{table}: {rows} rows updated")
+        print(f"{len(website_ids)} websites changed")
@@ -0,0 +1,103 @@
+import zlib
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Negotiated gzip/brotli for API payloads and exports. Responses with an ETag get a
+# per-encoding ETag ("<etag>-gzip"), so caches and If-None-Match keep the variants apart.
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv'}
+
+
+def choose_encoding(accept_encoding):
+    # Accept-Encoding header -> 'br', 'gzip' or None. Highest q-value wins; brotli on a tie.
+    accept = parse_accept_header(accept_encoding or '')
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0
+    for encoding in offered:
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    # Compresses a body chunk by chunk, flushing each so the client still receives data as
+    # it is produced
+
+    def __init__(self, encoding, gzip_level=6, brotli_quality=4):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._process, self._flush = self._compressor.process, self._compressor.flush
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._process, self._flush = self._compressor.compress, lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.encoding = encoding
+
+    def compress(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        return self._process(chunk) + self._flush()
+
+    def finish(self):
+        return self._compressor.finish() if self.encoding == 'br' else self._compressor.flush()
+
+
+def compress_stream(chunks, encoding, gzip_level=6, brotli_quality=4):
+    compressor = StreamCompressor(encoding, gzip_level, brotli_quality)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class Compression:
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def init_app(self, app):
+        app.extensions['compression'] = self
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        # direct_passthrough: files from send_file(), served with Range support as they are
+        if (response.status_code != 200 or request.method == 'HEAD' or response.direct_passthrough
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, self.gzip_level, self.brotli_quality)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(compress(body, encoding, self.gzip_level, self.brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag:
+            # The view checked If-None-Match against the identity ETag; check the variant's
+            response.set_etag(f'{etag}-{encoding}', weak)
+            response.make_conditional(request)
+        return response
@@ -1,9 +1,13 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Config:
+    # Blueprints create_app() registers when none are passed: any of ui, charts, lookup
+    APP_BLUEPRINTS = [name.strip() for name in os.getenv('APP_BLUEPRINTS', 'ui,charts,lookup').split(',') if name.strip()]
+
     # Existing SQLAlchemy configuration
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///default.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -13,4 +17,101 @@ class Config:
     DB_PORT = int(os.getenv('DB_PORT', 12395))
     DB_NAME = os.getenv('DB_NAME', 'defaultdb')
     DB_USER = os.getenv('DB_USER', 'avnadmin')
-    DB_PASSWORD = os.getenv('DB_PASSWORD', 'AVNS_uD1hFc3OPe9G-2EuuYv')
\ No newline at end of file
+    DB_PASSWORD = os.getenv('DB_PASSWORD', 'AVNS_uD1hFc3OPe9G-2EuuYv')
+    DB_SSL_DISABLED = os.getenv('DB_SSL_DISABLED', 'false').lower() in ('1', 'true', 'yes')
+
+    # Connection pool settings for the raw MySQL connections
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+    # Bulk lookup limits for /api/batch
+    API_BATCH_MAX_SIZE = int(os.getenv('API_BATCH_MAX_SIZE', 1000))
+    API_BATCH_CHUNK_SIZE = int(os.getenv('API_BATCH_CHUNK_SIZE', 200))
+
+    # Filter dropdown values for /websites are cached in-process for this many seconds.
+    # Set FACETS_FROM_TABLE to read them from website_facets (see `flask refresh-facets`).
+    FACET_CACHE_TTL = int(os.getenv('FACET_CACHE_TTL', 300))
+    FACETS_FROM_TABLE = os.getenv('FACETS_FROM_TABLE', 'false').lower() in ('1', 'true', 'yes')
+
+    # In-process search index for the /websites search box and /api/search/suggest.
+    # New websites are picked up every SEARCH_REFRESH_INTERVAL seconds; a full rebuild
+    # (edits and deletes) runs every SEARCH_REBUILD_INTERVAL. Queries matching more than
+    # SEARCH_MAX_RESULTS websites fall back to SQL ILIKE.
+    SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 2000))
+    SEARCH_REFRESH_INTERVAL = int(os.getenv('SEARCH_REFRESH_INTERVAL', 60))
+    SEARCH_REBUILD_INTERVAL = int(os.getenv('SEARCH_REBUILD_INTERVAL', 3600))
+
+    # /websites pagination. PAGINATION_COUNT_MODE is 'exact', 'estimate' (stop counting at
+    # PAGINATION_ESTIMATE_CAP) or 'none'; a ?count= parameter overrides it per request.
+    PAGINATION_COUNT_MODE = os.getenv('PAGINATION_COUNT_MODE', 'exact')
+    PAGINATION_ESTIMATE_CAP = int(os.getenv('PAGINATION_ESTIMATE_CAP', 10000))
+    PAGINATION_MAX_OFFSET_PAGE = int(os.getenv('PAGINATION_MAX_OFFSET_PAGE', 10))
+
+    # In-process NumPy snapshot of each website's main SEO metrics and lowest price, behind
+    # the /websites min_<metric>/max_<metric>/sort parameters and /api/websites/query. Rebuilt
+    # every SNAPSHOT_REFRESH_INTERVAL seconds; websites changed by `flask ingest` are patched
+    # in as the change feed reports them.
+    SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    SNAPSHOT_REFRESH_INTERVAL = int(os.getenv('SNAPSHOT_REFRESH_INTERVAL', 600))
+
+    # JSON encoder for API responses: 'orjson' (needs the orjson package), 'stdlib' (Flask's
+    # default) or 'auto' (orjson when installed)
+    JSON_SERIALIZER = os.getenv('JSON_SERIALIZER', 'auto')
+
+    # gzip/brotli for JSON and CSV responses (/api, /api/batch, /api/seo_metrics, exports),
+    # negotiated with Accept-Encoding; brotli needs the brotli package. Bodies smaller than
+    # COMPRESSION_MIN_SIZE bytes are sent as they are; streamed ones are always compressed.
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+    # Rows fetched per server-side cursor batch (and written per response chunk) by exports
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+
+    # Background exports (POST /websites/export/jobs): EXPORT_JOB_WORKERS processes write
+    # finished files to EXPORT_JOB_DIR, where they are kept EXPORT_JOB_TTL seconds. Point
+    # every web process at the same directory so they share jobs.
+    EXPORT_JOB_DIR = os.getenv('EXPORT_JOB_DIR', os.path.join(tempfile.gettempdir(), 'collaborator-exports'))
+    EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', 2))
+    EXPORT_JOB_TTL = int(os.getenv('EXPORT_JOB_TTL', 86400))
+
+    # Seconds to cache /api/seo_metrics leaderboards
+    LEADERBOARD_CACHE_TTL = int(os.getenv('LEADERBOARD_CACHE_TTL', 300))
+
+    # Cached /api bundles and website detail pages. RESPONSE_CACHE_BACKEND is 'memory'
+    # (per process, invalidated by ORM commits in that process), 'redis' (any
+    # Redis-compatible server at RESPONSE_CACHE_URL, shared by all workers) or 'none'.
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_MAXSIZE = int(os.getenv('RESPONSE_CACHE_MAXSIZE', 1000))
+
+    # Websites per transaction for `flask ingest`
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 1000))
+
+    # Web processes check the website_changes log this often (seconds) to drop cached
+    # entries for websites changed by `flask ingest`; ingest prunes entries older than
+    # CHANGE_LOG_RETENTION_DAYS
+    CHANGE_POLL_INTERVAL = int(os.getenv('CHANGE_POLL_INTERVAL', 5))
+    CHANGE_LOG_RETENTION_DAYS = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', 7))
+
+    # Request latency histograms, per-request SQL counts/time and pool gauges at /metrics
+    # (Prometheus text format, per process). Requests slower than SLOW_REQUEST_SECONDS are
+    # printed with their SLOW_REQUEST_MAX_STATEMENTS slowest statements.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1.0))
+    SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv('SLOW_REQUEST_MAX_STATEMENTS', 20))
+
+    # Apply the same sizing to the SQLAlchemy engine (SQLite doesn't take pool arguments)
+    SQLALCHEMY_ENGINE_OPTIONS = {} if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_POOL_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
\ No newline at end of file
@@ -0,0 +1,74 @@
+from models import db, Website, WebsiteCountry
+
+
+def split_countries(value):
+    # `countries` and `regions` are stored as comma-separated strings
+    seen = []
+    for c in (value or '').split(','):
+        c = c.strip()
+        if c and c not in seen:
+            seen.append(c)
+    return seen
+
+
+def country_key(name):
+    # website_countries.country_key: lookups compare lowercase, whatever the collation
+    return name.strip().lower()
+
+
+def country_rows(website_id, countries, regions):
+    rows = [{'website_id': website_id, 'country_name': c, 'country_key': country_key(c), 'kind': 'country'}
+            for c in split_countries(countries)]
+    rows += [{'website_id': website_id, 'country_name': r, 'country_key': country_key(r), 'kind': 'region'}
+             for r in split_countries(regions)]
+    return rows
+
+
+def sync_website_countries(websites, conn=None):
+    # Replace the website_countries rows for (id, countries, regions) tuples, on `conn`
+    # (e.g. the caller's engine.begin() transaction) or the session
+    websites = list(websites)
+    if not websites:
+        return 0
+    conn = conn if conn is not None else db.session
+    table = WebsiteCountry.__table__
+    conn.execute(table.delete().where(table.c.website_id.in_([w[0] for w in websites])))
+    rows = [row for w in websites for row in country_rows(*w)]
+    if rows:
+        conn.execute(table.insert(), rows)
+    return len(rows)
+
+
+def website_in_country(country):
+    # Country filter: indexed semi-join on (country_key, kind, website_id) instead of ILIKE
+    # over the CSV column. Any case; regions don't count as countries.
+    return Website.id.in_(db.session.query(WebsiteCountry.website_id).filter(
+        WebsiteCountry.country_key == country_key(country), WebsiteCountry.kind == 'country'
+    ))
+
+
+def website_country_starts_with(text):
+    # Free-text search: countries starting with the text ("germ" -> Germany). A prefix
+    # LIKE still walks the (country_key, ...) index.
+    return Website.id.in_(db.session.query(WebsiteCountry.website_id).filter(
+        WebsiteCountry.country_key.startswith(country_key(text), autoescape=True), WebsiteCountry.kind == 'country'
+    ))
+
+
+def backfill_countries(chunk_size=5000):
+    # Populate website_countries from websites.countries/regions, walking ids in chunks
+    WebsiteCountry.__table__.create(db.engine, checkfirst=True)
+
+    last_id, total_websites, total_rows = None, 0, 0
+    while True:
+        query = db.session.query(Website.id, Website.countries, Website.regions).order_by(Website.id)
+        if last_id is not None:
+            query = query.filter(Website.id > last_id)
+        chunk = query.limit(chunk_size).all()
+        if not chunk:
+            break
+        total_rows += sync_website_countries(chunk)
+        db.session.commit()
+        total_websites += len(chunk)
+        last_id = chunk[-1][0]
+    return total_websites, total_rows
@@ -0,0 +1,290 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+
+class PoolTimeout(Error):
+    # Raised when no connection becomes available within the wait timeout.
+    # Subclasses mysql.connector.Error so existing `except Error` blocks handle it.
+    pass
+
+
+class PooledConnection:
+    # Thin proxy around a raw mysql.connector connection. Everything is
+    # delegated to the real connection except close(), which hands the
+    # connection back to the pool instead of tearing down the TCP/TLS session.
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise Error("Connection has already been returned to the pool")
+        return getattr(raw, name)
+
+    def is_connected(self):
+        return self._raw is not None and self._raw.is_connected()
+
+    def cursor(self, *args, **kwargs):
+        if self._raw is None:
+            raise Error("Connection has already been returned to the pool")
+        cursor = self._raw.cursor(*args, **kwargs)
+        on_query = self._pool.on_query
+        return TimedCursor(cursor, on_query) if on_query else cursor
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._checkin(raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class TimedCursor:
+    # Cursor proxy that reports on_query(statement, seconds) for each statement it runs.
+    # Fetching a statement's rows counts towards it, so a statement is reported when the
+    # next one starts or the cursor is closed. multi=True results are reported one by one.
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+        self._last = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _report(self):
+        if self._last is not None:
+            statement, seconds = self._last
+            self._last = None
+            self._on_query(statement, seconds)
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._last is not None:
+                self._last[1] += time.perf_counter() - started
+
+    def execute(self, operation, params=None, multi=False):
+        self._report()
+        started = time.perf_counter()
+        if multi:
+            results = self._cursor.execute(operation, params, multi=True)
+            return self._iter_results(results, time.perf_counter() - started, operation)
+        try:
+            return self._cursor.execute(operation, params)
+        finally:
+            self._last = [operation, time.perf_counter() - started]
+
+    def _iter_results(self, results, seconds, operation):
+        # mysql.connector yields the cursor once per statement, as each result arrives
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    result = next(results)
+                except StopIteration:
+                    return
+                self._report()
+                self._last = [getattr(result, 'statement', None) or operation, seconds + time.perf_counter() - started]
+                seconds = 0
+                yield TimedResult(self, result)
+        finally:
+            self._report()
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def close(self):
+        self._report()
+        return self._cursor.close()
+
+
+class TimedResult:
+    # One statement's result within a TimedCursor multi=True execute
+
+    def __init__(self, timed_cursor, result):
+        self._timed_cursor = timed_cursor
+        self._result = result
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+    def fetchone(self):
+        return self._timed_cursor._timed(self._result.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed_cursor._timed(self._result.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed_cursor._timed(self._result.fetchall)
+
+
+class ConnectionPool:
+    # Bounded pool of mysql.connector connections.
+    #
+    # pool_size     connections kept open while idle
+    # max_overflow  extra connections allowed during bursts, closed on return
+    # timeout       seconds to wait for a free connection before PoolTimeout
+    # recycle       connections older than this many seconds are reopened (-1 disables)
+    # pre_ping      ping connections on checkout and replace dead ones
+    # on_query      called as on_query(statement, seconds) for every statement run
+    #               through a checked-out connection's cursors (None: no timing)
+
+    def __init__(self, db_config, pool_size=5, max_overflow=10, timeout=30,
+                 recycle=3600, pre_ping=True, on_query=None):
+        self.db_config = dict(db_config)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.on_query = on_query
+
+        self._idle = deque()
+        self._lock = threading.Condition()
+        self._total = 0
+        self._checked_out = 0
+        self._counters = {
+            'checkouts': 0,
+            'connects': 0,
+            'recycled': 0,
+            'invalidated': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    def _open(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Error:
+            pass
+
+    def _is_alive(self, raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def connect(self):
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    self._checked_out += 1
+                    break
+                if self._total < self.pool_size + self.max_overflow:
+                    raw, created_at = None, None
+                    self._total += 1
+                    self._checked_out += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"Connection pool exhausted: {self._total} connections in use, "
+                        f"waited {self.timeout}s"
+                    )
+                self._counters['waits'] += 1
+                self._lock.wait(remaining)
+            self._counters['checkouts'] += 1
+
+        # Validate or open outside the lock so a slow handshake doesn't block other callers
+        try:
+            if raw is not None:
+                if self.recycle >= 0 and time.monotonic() - created_at > self.recycle:
+                    self._discard(raw)
+                    raw = None
+                    self._bump('recycled')
+                elif self.pre_ping and not self._is_alive(raw):
+                    self._discard(raw)
+                    raw = None
+                    self._bump('invalidated')
+            if raw is None:
+                raw = self._open()
+                created_at = time.monotonic()
+                self._bump('connects')
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._checked_out -= 1
+                self._lock.notify()
+            raise
+
+        return PooledConnection(self, raw, created_at)
+
+    def _bump(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _checkin(self, raw, created_at):
+        # Reset session state so the next borrower starts clean
+        reusable = True
+        try:
+            if raw.is_connected():
+                raw.consume_results()
+                raw.rollback()
+            else:
+                reusable = False
+        except Error:
+            reusable = False
+
+        with self._lock:
+            self._checked_out -= 1
+            if reusable and self._total <= self.pool_size:
+                self._idle.append((raw, created_at))
+                raw = None
+            else:
+                self._total -= 1
+            self._lock.notify()
+
+        if raw is not None:
+            self._discard(raw)
+
+    def dispose(self):
+        # Close all idle connections; checked-out ones are closed when returned
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self._total -= len(idle)
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'timeout': self.timeout,
+                'recycle': self.recycle,
+                'open': self._total,
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'overflow': max(self._total - self.pool_size, 0),
+                **self._counters,
+            }
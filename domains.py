@@ -0,0 +1,27 @@
+def host_key(value):
+    # Canonical host for a name or URL: "https://www.Example.com:443/path" -> "example.com".
+    # Internationalised hosts are stored in their ASCII (punycode) form.
+    value = (value or '').strip().lower()
+    if '://' in value:
+        value = value.split('://', 1)[1]
+    for separator in ('/', '?', '#'):
+        value = value.split(separator, 1)[0]
+    value = value.rsplit('@', 1)[-1].split(':', 1)[0].rstrip('.')
+    if value.startswith('www.'):
+        value = value[4:]
+    if value and not value.isascii() and ' ' not in value:
+        try:
+            value = value.encode('idna').decode('ascii')
+        except UnicodeError:
+            # Not a valid hostname (e.g. a display name); keep the lowercase text
+            pass
+    return value or None
+
+
+def website_host_key(name, url, external_url):
+    # The key stored on websites.host_key: first usable host of url, external_url, name
+    for value in (url, external_url, name):
+        key = host_key(value)
+        if key:
+            return key
+    return None
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+
+from models import db, Website, WebsiteChange
+
+# Background /websites/export runs. Each job renders the same response as website_export()
+# in a separate worker process and writes it to EXPORT_JOB_DIR as <job id>.<extension>.
+# Its state lives next to it in <job id>.json, so every web worker can answer for it.
+#
+# The job id is a hash of the export parameters and the catalogue's data version, so
+# identical requests share one job (and its file) until the data changes.
+
+# Parameters that don't change what website_export() writes
+IGNORED_PARAMS = {'page', 'per_page', 'cursor', 'count'}
+
+JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def normalize_params(items):
+    # [(key, value)] -> the same pairs in a canonical order: keys sorted, repeated values
+    # (columns, include) kept in the order given, empty values dropped
+    params = {}
+    for key, value in items:
+        if key not in IGNORED_PARAMS and value not in (None, ''):
+            params.setdefault(key, []).append(str(value))
+    params.setdefault('export', ['csv'])
+    return [(key, value) for key in sorted(params) for value in params[key]]
+
+
+def data_version():
+    # Changes whenever websites are added or deleted, or `flask ingest` logs a change
+    # (edits made elsewhere without a website_changes entry keep the same version)
+    version = list(db.session.execute(select(func.count(Website.id), func.max(Website.id))).one())
+    try:
+        version.append(db.session.execute(select(func.max(WebsiteChange.id))).scalar())
+    except SQLAlchemyError:
+        # website_changes doesn't exist until `flask db upgrade`
+        db.session.rollback()
+        version.append(None)
+    return version
+
+
+def _write_json(path, data):
+    # Atomic replace, so readers never see a partial file
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(temporary, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Flask app of each worker process, built once by _init_worker
+_worker_app = None
+
+# Worker apps only render exports: no /metrics or response cache of their own
+WORKER_CONFIG = {'METRICS_ENABLED': False, 'RESPONSE_CACHE_BACKEND': 'none', 'COMPRESSION_ENABLED': False}
+
+
+def _init_worker(config):
+    global _worker_app
+    from factory import create_app
+
+    _worker_app = create_app(['ui'], {**config, **WORKER_CONFIG})
+
+
+def run_export_job(directory, job_id, params):
+    # Runs in a worker process: render the export, write it to disk, record the outcome
+    from ui_views import website_export
+
+    status_path = os.path.join(directory, f'{job_id}.json')
+    with open(status_path) as handle:
+        job = json.load(handle)
+    job.update(status='running', pid=os.getpid(), started_at=time.time())
+    _write_json(status_path, job)
+
+    with _worker_app.test_request_context('/websites/export', query_string=MultiDict(params)):
+        try:
+            response = website_export()
+            if isinstance(response, tuple):
+                response = response[0]
+            if response.status_code != 200:
+                raise RuntimeError(response.get_json().get('message', f'HTTP {response.status_code}'))
+            filename = response.headers.get('Content-Disposition', '').partition('filename=')[2] \
+                or f"websites_export.{dict(params).get('export', 'csv')}"
+            path = os.path.join(directory, f"{job_id}.{filename.rsplit('.', 1)[-1]}")
+            try:
+                with open(f'{path}.part', 'wb') as handle:
+                    for chunk in response.iter_encoded():
+                        handle.write(chunk)
+            finally:
+                response.close()
+            os.replace(f'{path}.part', path)
+            job.update(status='done', file=os.path.basename(path), filename=filename, mimetype=response.mimetype,
+                       size=os.path.getsize(path), finished_at=time.time())
+        except Exception as e:
+            job.update(status='failed', error=str(e), finished_at=time.time())
+        finally:
+            db.session.remove()
+    _write_json(status_path, job)
+
+
+class ExportJobs:
+    def __init__(self, directory, workers=2, ttl=86400, config=None):
+        # config: the app config the worker processes build their own app from
+        self.directory = directory
+        self.workers = workers
+        self.ttl = ttl
+        self.config = config or {}
+        self._executor = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _pool(self):
+        # Started on first use; 'spawn' so workers don't inherit this process's threads
+        # and open connections
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker, initargs=(self.config,)
+                )
+            return self._executor
+
+    def _status_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def get(self, job_id):
+        # The job's state, or None for unknown (or malformed) ids
+        if not JOB_ID.match(job_id or ''):
+            return None
+        try:
+            with open(self._status_path(job_id)) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def file_path(self, job):
+        return os.path.join(self.directory, job['file']) if job.get('file') else None
+
+    def _reusable(self, job):
+        if job is None:
+            return False
+        if job['status'] == 'done':
+            return os.path.exists(self.file_path(job))
+        # Queued or running in a process that is still there
+        return job['status'] in ('queued', 'running') and _pid_alive(job['pid'])
+
+    def submit(self, items):
+        # -> (job, created). Reuses the job for the same parameters and data version when it
+        # is done, queued or running.
+        params = normalize_params(items)
+        version = data_version()
+        job_id = hashlib.blake2b(json.dumps([params, version]).encode(), digest_size=16).hexdigest()
+
+        job = self.get(job_id)
+        if self._reusable(job):
+            return job, False
+        job = {'id': job_id, 'status': 'queued', 'params': params, 'data_version': version,
+               'pid': os.getpid(), 'created_at': time.time()}
+        status_path = self._status_path(job_id)
+        try:
+            # Only one process queues a new job; a failed or abandoned one is replaced
+            fd = os.open(status_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            with os.fdopen(fd, 'w') as handle:
+                json.dump(job, handle)
+        except FileExistsError:
+            existing = self.get(job_id)
+            if self._reusable(existing):
+                return existing, False
+            _write_json(status_path, job)
+
+        self.prune()
+        future = self._pool().submit(run_export_job, self.directory, job_id, params)
+        future.add_done_callback(lambda future: self._check_crash(job_id, future))
+        return job, True
+
+    def _check_crash(self, job_id, future):
+        # A worker that died mid-job (BrokenProcessPool) never recorded the outcome
+        error = future.exception()
+        if error is None:
+            return
+        job = self.get(job_id)
+        if job and job['status'] in ('queued', 'running'):
+            job.update(status='failed', error=f'Export worker failed: {error}', finished_at=time.time())
+            _write_json(self._status_path(job_id), job)
+        with self._lock:
+            self._executor = None
+
+    def prune(self):
+        # Drop finished jobs (and their files) older than ttl
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            job = self.get(name[:-5])
+            if job is None or job['status'] not in ('done', 'failed') or job.get('finished_at', 0) > cutoff:
+                continue
+            for path in (self.file_path(job), self._status_path(job['id'])):
+                try:
+                    if path:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,181 @@
+import csv
+from io import BytesIO, StringIO
+
+from flask import current_app
+
+from models import db, Website, WebsitePrice, WebsiteSEOMetric
+
+# Selectable export columns and the field names they are written under
+EXPORT_FIELDS = {
+    'name': 'name',
+    'url': 'url',
+    'countries': 'countries',
+    'language': 'language',
+    'rating_text': 'rating',
+    'count_review': 'review_count',
+    'domain_age': 'domain_age',
+    'domain_zone': 'domain_zone',
+    'speed': 'speed',
+    'amount_total_deals': 'total_deals',
+}
+
+DEFAULT_EXPORT_COLUMNS = ['name', 'url', 'countries', 'language']
+
+
+def export_columns(requested):
+    columns = [c for c in requested if c in EXPORT_FIELDS]
+    return columns or DEFAULT_EXPORT_COLUMNS
+
+
+def export_rows(query, columns, chunk_size):
+    # Select only the exported columns and stream them with a server-side cursor
+    return query.with_entities(*[getattr(Website, c) for c in columns]).execution_options(yield_per=chunk_size)
+
+
+def _chunked(lines, chunk_size):
+    # Join small writes into chunk_size-line blocks for the response
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) >= chunk_size:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def iter_csv(rows, columns, chunk_size):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def lines():
+        writer.writerow([EXPORT_FIELDS[c] for c in columns])
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _chunked(lines(), chunk_size)
+
+
+def iter_ndjson(rows, columns, chunk_size):
+    # Encoded with the app's JSON provider (orjson when configured), fields in column order
+    dumps = current_app.json.dumps
+    fields = [EXPORT_FIELDS[c] for c in columns]
+    lines = (dumps(dict(zip(fields, row)), sort_keys=False) + '\n' for row in rows)
+    return _chunked(lines, chunk_size)
+
+
+def iter_json(rows, columns, chunk_size):
+    # A single JSON array, written incrementally
+    dumps = current_app.json.dumps
+    fields = [EXPORT_FIELDS[c] for c in columns]
+
+    def lines():
+        yield '['
+        for index, row in enumerate(rows):
+            yield (', ' if index else '') + dumps(dict(zip(fields, row)), sort_keys=False)
+        yield ']'
+
+    return _chunked(lines(), chunk_size)
+
+
+# Numeric columns pulled into columnar exports with include=seo / include=prices
+SEO_EXPORT_COLUMNS = [
+    'ahrefs_rank', 'ahrefs_dr', 'ahrefs_ur', 'ahrefs_backlinks', 'ahrefs_refdomains', 'ahrefs_keywords',
+    'ahrefs_traffic', 'serpstat_domain_rank', 'serpstat_referring_domains', 'serpstat_referring_links',
+    'tf', 'cf', 'da_moz', 'majestic_links', 'majestic_ref_domains', 'google_index', 'tr',
+    'gsc_clicks', 'gsc_impressions',
+]
+PRICE_EXPORT_COLUMNS = ['price_publication', 'price_publication_old', 'publication_with_contr_categories', 'price_spelling']
+
+# Integer columns on websites; everything else selectable is text
+INTEGER_EXPORT_COLUMNS = {'count_review'}
+
+
+class ExportDependencyError(Exception):
+    pass
+
+
+def build_frame(query, columns, include, chunk_size):
+    # Typed DataFrame of the export: text columns as strings, counts as nullable ints and
+    # Numeric(12,2) metrics as float64, one row per website
+    import pandas as pd
+
+    fields = [EXPORT_FIELDS[c] for c in columns]
+    chunks = []
+    for rows in _batched(export_rows(query, ['id'] + columns, chunk_size), chunk_size):
+        chunks.append(pd.DataFrame.from_records(rows, columns=['website_id'] + fields))
+    frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['website_id'] + fields)
+    frame['website_id'] = frame['website_id'].astype('int64')
+
+    for column, field in zip(columns, fields):
+        frame[field] = frame[field].astype('Int64' if column in INTEGER_EXPORT_COLUMNS else 'string')
+
+    # Child tables are read once for the whole filtered set and merged on website_id
+    website_ids = query.with_entities(Website.id).order_by(None).subquery()
+
+    if 'seo' in include:
+        seo = pd.DataFrame.from_records(
+            db.session.query(WebsiteSEOMetric.website_id, *[getattr(WebsiteSEOMetric, c) for c in SEO_EXPORT_COLUMNS])
+            .filter(WebsiteSEOMetric.website_id.in_(db.session.query(website_ids.c.id)))
+            .order_by(WebsiteSEOMetric.id).all(),
+            columns=['website_id'] + SEO_EXPORT_COLUMNS
+        ).drop_duplicates('website_id')
+        frame = frame.merge(seo.astype({c: 'float64' for c in SEO_EXPORT_COLUMNS}), on='website_id', how='left')
+
+    if 'prices' in include:
+        prices = pd.DataFrame.from_records(
+            db.session.query(WebsitePrice.website_id, *[getattr(WebsitePrice, c) for c in PRICE_EXPORT_COLUMNS])
+            .filter(WebsitePrice.website_id.in_(db.session.query(website_ids.c.id))).all(),
+            columns=['website_id'] + PRICE_EXPORT_COLUMNS
+        ).astype({c: 'float64' for c in PRICE_EXPORT_COLUMNS})
+        # Cheapest offer per website, plus how many price formats it has
+        prices = prices.groupby('website_id').agg(
+            price_formats=('website_id', 'size'),
+            **{f'min_{c}': (c, 'min') for c in PRICE_EXPORT_COLUMNS}
+        ).reset_index()
+        frame = frame.merge(prices, on='website_id', how='left')
+        frame['price_formats'] = frame['price_formats'].fillna(0).astype('Int64')
+
+    return frame
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_columnar(frame, export_format):
+    # Parquet or Arrow IPC (Feather v2) bytes; both need pyarrow behind pandas
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ExportDependencyError(f"{export_format} export requires the pyarrow package")
+
+    buffer = BytesIO()
+    if export_format == 'parquet':
+        frame.to_parquet(buffer, index=False, compression='zstd')
+    else:
+        frame.to_feather(buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+COLUMNAR_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+}
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'json': (iter_json, 'application/json', 'json'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+}
@@ -0,0 +1,59 @@
+from flask import current_app
+
+from cache import TTLCache
+from models import db, Website, WebsiteCategory, WebsiteCountry, WebsiteFacet
+
+# Dropdown values for the /websites filters, shared by all requests in the process
+facet_cache = TTLCache()
+
+FACET_NAMES = ('categories', 'countries', 'languages')
+
+
+def compute_facets():
+    categories = WebsiteCategory.query.with_entities(WebsiteCategory.category_name).filter(
+        WebsiteCategory.category_name.isnot(None)).distinct().all()
+    # Both read straight off an index
+    countries = WebsiteCountry.query.with_entities(WebsiteCountry.country_name).filter(
+        WebsiteCountry.kind == 'country').distinct().all()
+    languages = Website.query.with_entities(Website.language).filter(Website.language.isnot(None)).distinct().all()
+
+    return {
+        'categories': sorted(c[0] for c in categories),
+        'countries': sorted(c[0] for c in countries),
+        'languages': sorted(l[0] for l in languages),
+    }
+
+
+def load_facet_table():
+    facets = {name: [] for name in FACET_NAMES}
+    rows = WebsiteFacet.query.order_by(WebsiteFacet.facet, WebsiteFacet.value).all()
+    for row in rows:
+        facets.setdefault(row.facet, []).append(row.value)
+    return facets
+
+
+def refresh_facet_table():
+    # Recompute the facets and store them in website_facets for FACETS_FROM_TABLE mode
+    WebsiteFacet.__table__.create(db.engine, checkfirst=True)
+    facets = compute_facets()
+    WebsiteFacet.query.delete()
+    db.session.add_all(
+        WebsiteFacet(facet=name, value=value)
+        for name, values in facets.items()
+        for value in values
+    )
+    db.session.commit()
+    invalidate_facets()
+    return facets
+
+
+def get_facets():
+    if current_app.config['FACETS_FROM_TABLE']:
+        loader = load_facet_table
+    else:
+        loader = compute_facets
+    return facet_cache.get_or_set('facets', loader, ttl=current_app.config['FACET_CACHE_TTL'])
+
+
+def invalidate_facets():
+    facet_cache.invalidate('facets')
@@ -0,0 +1,164 @@
+import importlib
+
+from flask import Flask, current_app, request
+from flask_cors import CORS
+
+from config import Config
+
+# Blueprint name -> module. Modules are imported only for the blueprints an app is built
+# with, so a lookup-only worker never loads SQLAlchemy, the UI code or pandas.
+BLUEPRINTS = {
+    'ui': 'ui_views',          # pages and the export
+    'charts': 'chart_views',   # /charts and the chart/leaderboard JSON endpoints
+    'lookup': 'lookup_views',  # /api, /api/batch and /health over the raw MySQL pool
+}
+# Blueprints that read the catalogue through SQLAlchemy
+ORM_BLUEPRINTS = {'ui', 'charts'}
+
+
+def create_app(blueprints=None, config=None):
+    # blueprints defaults to APP_BLUEPRINTS; config overrides individual Config values,
+    # e.g. create_app(['lookup']) for the lookup API on its own
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(config or {})
+    blueprints = list(blueprints or app.config['APP_BLUEPRINTS'])
+    unknown = [name for name in blueprints if name not in BLUEPRINTS]
+    if unknown:
+        raise ValueError(f"Unknown blueprint: {', '.join(unknown)}. Available: {', '.join(BLUEPRINTS)}")
+    CORS(app)  # Enable CORS for all routes
+
+    from serialization import init_json
+
+    init_json(app)
+    if app.config['COMPRESSION_ENABLED']:
+        from compression import Compression
+
+        Compression(
+            app.config['COMPRESSION_MIN_SIZE'],
+            app.config['COMPRESSION_GZIP_LEVEL'],
+            app.config['COMPRESSION_BROTLI_QUALITY']
+        ).init_app(app)
+
+    on_query = None
+    if app.config['METRICS_ENABLED']:
+        from metrics import Metrics, record_query
+
+        # Latency/SQL profiling for every request, served at /metrics
+        Metrics(app.config['SLOW_REQUEST_SECONDS'], app.config['SLOW_REQUEST_MAX_STATEMENTS']).init_app(app)
+        on_query = record_query
+
+    from response_cache import ResponseCache, create_backend
+
+    # Rendered /api bundles and detail pages
+    response_cache = ResponseCache(create_backend(
+        app.config['RESPONSE_CACHE_BACKEND'],
+        url=app.config['RESPONSE_CACHE_URL'],
+        ttl=app.config['RESPONSE_CACHE_TTL'],
+        maxsize=app.config['RESPONSE_CACHE_MAXSIZE']
+    ))
+    app.extensions['response_cache'] = response_cache
+
+    if 'lookup' in blueprints:
+        from db_pool import ConnectionPool
+
+        # Shared, bounded pool so requests reuse connections instead of reconnecting each time
+        DB_CONFIG = {
+            'host': app.config['DB_HOST'],
+            'port': app.config['DB_PORT'],
+            'database': app.config['DB_NAME'],
+            'user': app.config['DB_USER'],
+            'password': app.config['DB_PASSWORD']
+        }
+        if app.config['DB_SSL_DISABLED']:
+            DB_CONFIG['ssl_disabled'] = True
+        app.extensions['db_pool'] = ConnectionPool(
+            DB_CONFIG,
+            pool_size=app.config['DB_POOL_SIZE'],
+            max_overflow=app.config['DB_POOL_MAX_OVERFLOW'],
+            timeout=app.config['DB_POOL_TIMEOUT'],
+            recycle=app.config['DB_POOL_RECYCLE'],
+            pre_ping=app.config['DB_POOL_PRE_PING'],
+            on_query=on_query
+        )
+        if not ORM_BLUEPRINTS & set(blueprints):
+            from lookup import LookupChangeFeed, invalidate_websites
+
+            # Without SQLAlchemy's ChangeFeed, follow website_changes over the raw pool so
+            # bundles and resolved inputs of websites changed by `flask ingest` are dropped
+            lookup_feed = LookupChangeFeed(interval=app.config['CHANGE_POLL_INTERVAL'])
+
+            @app.before_request
+            def apply_lookup_changes():
+                invalidate_websites(response_cache, lookup_feed.poll(app.extensions['db_pool']))
+
+    if ORM_BLUEPRINTS & set(blueprints):
+        init_catalogue(app, response_cache)
+
+    if 'ui' in blueprints:
+        from export_jobs import ExportJobs
+
+        # Background exports; the worker processes build their own app from this config
+        app.extensions['export_jobs'] = ExportJobs(
+            app.config['EXPORT_JOB_DIR'],
+            workers=app.config['EXPORT_JOB_WORKERS'],
+            ttl=app.config['EXPORT_JOB_TTL'],
+            config={key: app.config[key] for key in dir(Config) if key.isupper()}
+        )
+
+    for name in blueprints:
+        app.register_blueprint(importlib.import_module(BLUEPRINTS[name]).bp)
+    return app
+
+
+def init_catalogue(app, response_cache):
+    # SQLAlchemy, cache invalidation and the CLI, for apps that serve the catalogue.
+    # A lookup-only app follows website_changes over the raw pool instead (see create_app).
+    from changes import ChangeFeed
+    from commands import register_commands
+    from models import db, Website
+    from response_cache import invalidate_on_commit
+
+    db.init_app(app)
+    if 'metrics' in app.extensions:
+        from metrics import instrument_sqlalchemy
+
+        instrument_sqlalchemy()
+    # ORM commits drop the entries of the websites they touch
+    invalidate_on_commit(response_cache, Website)
+
+    # Websites written by `flask ingest` (another process) are picked up from website_changes
+    change_feed = ChangeFeed(interval=app.config['CHANGE_POLL_INTERVAL'])
+
+    @app.before_request
+    def apply_catalogue_changes():
+        changes = change_feed.poll()
+        if changes:
+            invalidate_catalogue({website_id for website_id, _ in changes})
+
+    register_commands(app)
+
+
+def invalidate_catalogue(website_ids):
+    # Drop everything cached about these websites (and the aggregates they feed)
+    from facets import invalidate_facets
+    from leaderboards import invalidate_leaderboards
+    from lookup import invalidate_resolver
+    from rollups import rollup_cache
+    from search import apply_search_changes
+    from snapshot import apply_snapshot_changes
+
+    current_app.extensions['response_cache'].invalidate_website(*website_ids)
+    invalidate_resolver()
+    invalidate_facets()
+    invalidate_leaderboards()
+    rollup_cache.clear()
+    apply_search_changes(website_ids)
+    apply_snapshot_changes(website_ids)
+
+
+def conditional_response(body, etag, mimetype):
+    # Strong ETag; a matching If-None-Match turns this into an empty 304
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    return response.make_conditional(request)
@@ -0,0 +1,284 @@
+import csv
+import gzip
+import hashlib
+import json
+import sys
+import time
+
+import pandas as pd
+from sqlalchemy import select
+
+from changes import record_changes
+from countries import sync_website_countries
+from domains import website_host_key
+from lookup import CHILD_TABLES
+from models import db, Website
+from parsing import parse_raw_columns
+
+# Snapshots are one website per record, in the same shape /api returns: the website
+# columns plus one key per child table ("badges", "prices", "seo_metrics", ...). JSONL
+# holds nested lists/objects; in CSV the child columns hold JSON-encoded lists.
+
+WEBSITE_COLUMNS = [c.name for c in Website.__table__.columns]
+# Computed by ingest rather than read from the snapshot
+DERIVED_COLUMNS = {'host_key', 'content_hash'}
+BOOLEAN_COLUMNS = {'is_free_announcement', 'is_paid_announcement', 'is_spelling_free'}
+INTEGER_COLUMNS = {'count_review', 'category_id', 'contr_id', 'format_id'}
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+
+def _open(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8', newline='')
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'csv' if name.endswith('.csv') else 'jsonl'
+
+
+def iter_records(path, fmt):
+    # Stream records one at a time so the snapshot never has to fit in memory
+    handle = _open(path)
+    try:
+        if fmt == 'csv':
+            for row in csv.DictReader(handle):
+                record = {key: (value if value != '' else None) for key, value in row.items()}
+                for key, _, _ in CHILD_TABLES:
+                    if record.get(key):
+                        record[key] = json.loads(record[key])
+                yield record
+        else:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def iter_batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _coerce(frame, table):
+    # Vectorised type conversion for one table's batch
+    for column in frame.columns:
+        if column in BOOLEAN_COLUMNS:
+            text = frame[column].astype('string').str.strip().str.lower()
+            frame[column] = text.map(lambda v: True if v in TRUE_VALUES else False if v in FALSE_VALUES else None)
+        elif column in INTEGER_COLUMNS or column in ('id', 'website_id'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('Int64')
+    return parse_raw_columns(frame, table)
+
+
+def _rows(frame, columns):
+    # Records for executemany, with pandas' missing markers turned into NULLs
+    frame = frame.reindex(columns=columns).astype(object)
+    frame = frame.where(frame.notna(), None)
+    return [dict(zip(columns, row)) for row in frame.itertuples(index=False, name=None)]
+
+
+def content_hash(website, children):
+    # Hash of everything ingest writes for one website (its row minus derived columns, plus
+    # its child rows in snapshot order); an unchanged hash means the website can be skipped
+    payload = {'website': {k: v for k, v in website.items() if k not in DERIVED_COLUMNS}, **children}
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def prepare_batch(records):
+    # -> (websites frame, {table: [child rows]}, number of records skipped for lacking an id)
+    websites = pd.DataFrame.from_records(
+        [{column: record.get(column) for column in WEBSITE_COLUMNS} for record in records],
+        columns=WEBSITE_COLUMNS
+    )
+    websites = _coerce(websites, 'websites')
+    has_id = websites['id'].notna()
+    skipped = int((~has_id).sum())
+    # A website repeated within the batch: the last record wins
+    keep = has_id & ~websites['id'].duplicated(keep='last')
+    kept_records = [record for record, ok in zip(records, keep) if ok]
+    websites = websites[keep].reset_index(drop=True)
+    websites['host_key'] = [
+        website_host_key(name, url, external_url)
+        for name, url, external_url in zip(websites['name'], websites['url'], websites['external_url'])
+    ]
+
+    children = {}
+    for key, table, _ in CHILD_TABLES:
+        columns = [c.name for c in db.metadata.tables[table].columns if c.name != 'id']
+        rows = [
+            {**child, 'website_id': int(website_id)}
+            for record, website_id in zip(kept_records, websites['id'])
+            for child in _as_list(record.get(key)) if isinstance(child, dict)
+        ]
+        frame = pd.DataFrame.from_records(rows, columns=None if rows else columns)
+        children[table] = _rows(_coerce(frame.reindex(columns=columns), table), columns)
+
+    by_website = {int(website_id): {table: [] for table in children} for website_id in websites['id']}
+    for table, rows in children.items():
+        for row in rows:
+            by_website[row['website_id']][table].append(row)
+    websites['content_hash'] = [
+        content_hash(website, by_website[website['id']]) for website in _rows(websites, WEBSITE_COLUMNS)
+    ]
+    return websites, children, skipped
+
+
+def _release_host_keys(conn, websites):
+    # host_key is unique: a host already owned by another website (or repeated within the
+    # batch) is left NULL on the newcomer, which stays reachable by name/url
+    websites.loc[websites['host_key'].duplicated() & websites['host_key'].notna(), 'host_key'] = None
+    keys = [key for key in websites['host_key'] if key]
+    if not keys:
+        return
+    table = Website.__table__
+    owners = dict(conn.execute(select(table.c.host_key, table.c.id).where(table.c.host_key.in_(keys))).all())
+    taken = [owners.get(key) not in (None, website_id) for key, website_id in zip(websites['host_key'], websites['id'])]
+    websites.loc[taken, 'host_key'] = None
+
+
+def upsert(conn, table, rows):
+    # Multi-row INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT on SQLite/Postgres)
+    if not rows:
+        return
+    columns = [c for c in rows[0] if c != 'id']
+    if conn.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update({c: statement.inserted[c] for c in columns})
+    else:
+        if conn.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['id'], set_={c: statement.excluded[c] for c in columns}
+        )
+    conn.execute(statement, rows)
+
+
+def _delete_websites(conn, ids):
+    for table_name in [table for _, table, _ in CHILD_TABLES] + ['website_countries']:
+        table = db.metadata.tables[table_name]
+        conn.execute(table.delete().where(table.c.website_id.in_(ids)))
+    conn.execute(Website.__table__.delete().where(Website.__table__.c.id.in_(ids)))
+
+
+def write_batch(websites, children, force=False):
+    # One transaction per batch: upsert the websites whose content hash changed (all of
+    # them with force), replace their child and website_countries rows and log the changes.
+    # Returns (changes as [(website_id, 'insert' | 'update')], rows written).
+    table = Website.__table__
+    with db.engine.begin() as conn:
+        ids = [int(i) for i in websites['id']]
+        stored = dict(conn.execute(select(table.c.id, table.c.content_hash).where(table.c.id.in_(ids))).all())
+        changes = [
+            (website_id, 'update' if website_id in stored else 'insert')
+            for website_id, new_hash in zip(ids, websites['content_hash'])
+            if force or website_id not in stored or stored[website_id] != new_hash
+        ]
+        if not changes:
+            return [], 0
+
+        changed = {website_id for website_id, _ in changes}
+        websites = websites[websites['id'].isin(changed)].copy()
+        _release_host_keys(conn, websites)
+        upsert(conn, table, _rows(websites, WEBSITE_COLUMNS))
+        written = len(websites)
+        for table_name, rows in children.items():
+            child_table = db.metadata.tables[table_name]
+            conn.execute(child_table.delete().where(child_table.c.website_id.in_(changed)))
+            rows = [row for row in rows if row['website_id'] in changed]
+            if rows:
+                conn.execute(child_table.insert(), rows)
+            written += len(rows)
+        # website_countries mirrors the countries/regions columns
+        sync_website_countries(
+            ((row['id'], row['countries'], row['regions']) for row in _rows(websites, ['id', 'countries', 'regions'])),
+            conn
+        )
+        record_changes(conn, changes)
+    return changes, written
+
+
+def delete_missing(seen_ids, chunk_size=5000):
+    # After a full snapshot: delete websites it didn't contain, walking ids in chunks
+    table = Website.__table__
+    deleted, last_id = [], 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                select(table.c.id).where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+            ).scalars().all()
+            if not ids:
+                return deleted
+            last_id = ids[-1]
+            missing = [website_id for website_id in ids if website_id not in seen_ids]
+            if missing:
+                _delete_websites(conn, missing)
+                record_changes(conn, [(website_id, 'delete') for website_id in missing])
+                deleted += missing
+
+
+def ingest_snapshot(path, fmt=None, batch_size=1000, force=False, full=False, on_change=None, echo=print):
+    # Load a snapshot in batches, writing only websites whose content hash changed. With
+    # full=True the snapshot is the whole catalogue and websites missing from it are deleted.
+    # on_change receives [(website_id, change)] after each committed batch.
+    fmt = fmt or detect_format(path)
+    started = time.perf_counter()
+    stats = {'websites': 0, 'insert': 0, 'update': 0, 'unchanged': 0, 'delete': 0, 'rows': 0, 'skipped': 0}
+    seen_ids = set()
+
+    for records in iter_batches(iter_records(path, fmt), batch_size):
+        websites, children, skipped = prepare_batch(records)
+        stats['skipped'] += skipped
+        if websites.empty:
+            continue
+        seen_ids.update(int(i) for i in websites['id'])
+        changes, written = write_batch(websites, children, force)
+        if changes and on_change:
+            on_change(changes)
+
+        stats['websites'] += len(websites)
+        stats['unchanged'] += len(websites) - len(changes)
+        for _, change in changes:
+            stats[change] += 1
+        stats['rows'] += written
+        elapsed = time.perf_counter() - started
+        echo(f"{stats['websites']} websites, {stats['insert'] + stats['update']} changed, "
+             f"{stats['rows']} rows written ({stats['rows'] / elapsed:.0f} rows/s)")
+
+    if full:
+        if seen_ids:
+            deleted = delete_missing(seen_ids)
+            stats['delete'] = len(deleted)
+            if deleted and on_change:
+                on_change([(website_id, 'delete') for website_id in deleted])
+        else:
+            echo("Snapshot is empty; not deleting anything")
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,33 @@
+from cache import TTLCache
+from models import db, Website, WebsiteSEOMetric
+
+# Every parsed (Numeric) column of website_seo_metrics can be ranked
+SEO_METRICS = [
+    column.key for column in WebsiteSEOMetric.__table__.columns
+    if isinstance(column.type, db.Numeric)
+]
+
+DEFAULT_METRICS = ['ahrefs_dr', 'ahrefs_traffic', 'da_moz']
+
+# Top-N results keyed by (metric, limit)
+leaderboard_cache = TTLCache(maxsize=256)
+
+
+def top_websites(metric, limit):
+    # One query: website name and metric value together, so the two lists can't drift apart
+    column = getattr(WebsiteSEOMetric, metric)
+    rows = db.session.query(Website.name, column).join(
+        WebsiteSEOMetric, WebsiteSEOMetric.website_id == Website.id
+    ).filter(column.isnot(None)).order_by(column.desc(), WebsiteSEOMetric.website_id.desc()).limit(limit).all()
+    return {
+        'names': [name for name, _ in rows],
+        'values': [float(value) for _, value in rows],
+    }
+
+
+def get_leaderboard(metric, limit, ttl):
+    return leaderboard_cache.get_or_set((metric, limit), lambda: top_websites(metric, limit), ttl=ttl)
+
+
+def invalidate_leaderboards():
+    leaderboard_cache.clear()
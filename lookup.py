@@ -0,0 +1,306 @@
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+
+from mysql.connector import Error
+
+from cache import TTLCache
+from domains import host_key
+
+# Child tables returned with every website bundle: (bundle key, table, single row per website)
+CHILD_TABLES = [
+    ('badges', 'website_badges', False),
+    ('categories', 'website_categories', False),
+    ('contr_categories', 'website_contr_categories', False),
+    ('prices', 'website_prices', False),
+    ('traffic', 'website_traffic', False),
+    ('traffic_geo', 'website_traffic_geo', False),
+    ('seo_metrics', 'website_seo_metrics', True),
+]
+CHILD_KEYS = {key for key, _, _ in CHILD_TABLES}
+# Derived websites columns that stay out of the public bundle (see domains.py and ingest.py)
+INTERNAL_COLUMNS = ('host_key', 'content_hash')
+
+
+# Raw /api input -> website_id. Bounded LRU; the TTL caps how long a renamed or
+# deleted website can keep resolving to its old id.
+resolver_cache = TTLCache(ttl=3600, maxsize=10000)
+
+
+def _placeholders(count):
+    return ', '.join(['%s'] * count)
+
+
+def _fold(value):
+    # MySQL's default collations compare case-insensitively; mirror that when
+    # matching rows back to the terms that found them
+    return value.casefold() if isinstance(value, str) else value
+
+
+# Statement builders and row matchers shared by the blocking lookups below and the
+# asyncio ones in async_lookup.py
+
+
+def resolve_query(terms):
+    # -> ({term: canonical host}, sql, params): exact name/url/external_url matches and the
+    # unique host_key index in one statement (MySQL unions the indexes)
+    keys = {term: host_key(term) for term in terms}
+    distinct = list(OrderedDict.fromkeys(key for key in keys.values() if key))
+    marks = _placeholders(len(terms))
+    sql = (f"SELECT id, name, url, external_url, host_key FROM websites "
+           f"WHERE name IN ({marks}) OR url IN ({marks}) OR external_url IN ({marks})")
+    if distinct:
+        sql += f" OR host_key IN ({_placeholders(len(distinct))})"
+    return keys, sql + " ORDER BY id", tuple(terms) * 3 + tuple(distinct)
+
+
+def match_columns(terms, rows):
+    # Lowest id wins when a term matches several websites
+    by_value = {}
+    for row in rows:
+        for column in ('name', 'url', 'external_url'):
+            by_value.setdefault(_fold(row[column]), row['id'])
+    return {term: by_value[_fold(term)] for term in terms if _fold(term) in by_value}
+
+
+def match_host_keys(keys, rows):
+    ids = {row['host_key']: row['id'] for row in rows if row['host_key']}
+    return {term: ids[key] for term, key in keys.items() if key in ids}
+
+
+def match_rows(keys, rows):
+    # {term: website_id}. Exact matches win over the host key, so a URL on a shared host
+    # (e.g. https://medium.com/@someblog) resolves to its own website, whose host_key is
+    # NULL, rather than to the website that owns the host.
+    return {**match_host_keys(keys, rows), **match_columns(list(keys), rows)}
+
+
+def cached_ids(terms):
+    # Split terms into ({term: website_id} already in the resolver cache, [terms to resolve])
+    resolved = {}
+    for term in terms:
+        website_id = resolver_cache.get(term)
+        if website_id is not None:
+            resolved[term] = website_id
+    return resolved, [term for term in terms if term not in resolved]
+
+
+def remember_ids(found):
+    # Only hits are cached: a missing website may appear later
+    for term, website_id in found.items():
+        resolver_cache.set(term, website_id)
+
+
+def bundle_statements(website_ids):
+    # [(sql, params)]: the website rows, then each child table in CHILD_TABLES order
+    marks = _placeholders(len(website_ids))
+    params = tuple(website_ids)
+    return [(f"SELECT * FROM websites WHERE id IN ({marks})", params)] + [
+        (f"SELECT * FROM {table} WHERE website_id IN ({marks}) ORDER BY website_id, id", params)
+        for _, table, _ in CHILD_TABLES
+    ]
+
+
+def assemble_bundles(results):
+    # Row lists in bundle_statements() order -> {website_id: bundle}
+    bundles = {}
+    for row in results[0]:
+        row = {column: value for column, value in row.items() if column not in INTERNAL_COLUMNS}
+        bundles[row['id']] = {**row, **{key: None if single else [] for key, _, single in CHILD_TABLES}}
+    for (key, _, single), rows in zip(CHILD_TABLES, results[1:]):
+        for row in rows:
+            bundle = bundles.get(row['website_id'])
+            if bundle is None:
+                continue
+            if single:
+                if bundle[key] is None:
+                    bundle[key] = row
+            else:
+                bundle[key].append(row)
+    return bundles
+
+
+def parse_fields(value):
+    # ?fields= projection of a bundle -> (includes, excludes), or None for the whole bundle.
+    # "name,url,prices.title" keeps only those keys (a child key keeps its rows whole,
+    # "child.column" keeps that column of them); "-*_raw,-*tooltip" drops matching keys at
+    # any level, or "child.column" in one child table. Glob patterns are allowed in both.
+    items = [item.strip() for item in (value or '').split(',') if item.strip()]
+    if not items:
+        return None
+    return [i for i in items if not i.startswith('-')], [i[1:] for i in items if i.startswith('-')]
+
+
+def _matches(patterns, *names):
+    return any(fnmatchcase(name, pattern) for pattern in patterns for name in names)
+
+
+def project_bundle(bundle, fields):
+    # A copy of the bundle with only the fields parse_fields() selected
+    includes, excludes = fields
+    top = [i for i in includes if '.' not in i]
+    projected = {}
+    for key, value in bundle.items():
+        if _matches(excludes, key):
+            continue
+        child_includes = [i.split('.', 1)[1] for i in includes if '.' in i and fnmatchcase(key, i.split('.', 1)[0])]
+        if includes and not child_includes and not _matches(top, key):
+            continue
+        if key in CHILD_KEYS and value is not None:
+            # Child columns are kept when named (or when the whole child table is), unless excluded
+            keep_all = not child_includes or _matches(top, key)
+
+            def project(row):
+                return {column: v for column, v in row.items()
+                        if (keep_all or _matches(child_includes, column))
+                        and not _matches(excludes, column, f'{key}.{column}')}
+
+            value = project(value) if isinstance(value, dict) else [project(row) for row in value]
+        projected[key] = value
+    return projected
+
+
+def bundles_by_term(website_ids, bundles):
+    # {term: bundle or None}, forgetting cached ids of websites that have since been deleted
+    for term, website_id in website_ids.items():
+        if website_id is not None and website_id not in bundles:
+            resolver_cache.invalidate(term)
+    return {term: bundles.get(website_id) for term, website_id in website_ids.items()}
+
+
+def resolve_website_ids(cursor, terms):
+    # {term: website_id or None}. Raw inputs are remembered in an LRU, so repeat lookups
+    # skip resolution entirely.
+    terms = list(OrderedDict.fromkeys(terms))
+    resolved, pending = cached_ids(terms)
+    if pending:
+        keys, sql, params = resolve_query(pending)
+        cursor.execute(sql, params)
+        found = match_rows(keys, cursor.fetchall())
+        remember_ids(found)
+        resolved.update(found)
+    return {term: resolved.get(term) for term in terms}
+
+
+class LookupChangeFeed:
+    # changes.ChangeFeed for the lookup-only servers (api.py, asgi.py), over the raw pools so
+    # they never load SQLAlchemy. Each poll is a MAX(id) check, at most once per `interval`
+    # seconds; new website_changes rows are only read when it moved. Caches start empty,
+    # so older history is never replayed.
+    LATEST_SQL = "SELECT MAX(id) AS id FROM website_changes"
+    CHANGES_SQL = "SELECT id, website_id FROM website_changes WHERE id > %s ORDER BY id LIMIT %s"
+
+    def __init__(self, interval=5, batch_size=5000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_id = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def due(self):
+        # Claims the next poll; False while throttled
+        if time.monotonic() - self._checked_at < self.interval:
+            return False
+        self._checked_at = time.monotonic()
+        return True
+
+    def poll(self, pool):
+        # -> [website_id] changed since the previous poll, read through a ConnectionPool
+        if not self.due() or not self._lock.acquire(blocking=False):
+            return []
+        website_ids = []
+        try:
+            with pool.connect() as conn:
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    cursor.execute(self.LATEST_SQL)
+                    latest = cursor.fetchone()['id'] or 0
+                    if self.last_id is None:
+                        self.last_id = latest
+                    while latest > self.last_id:
+                        cursor.execute(self.CHANGES_SQL, (self.last_id, self.batch_size))
+                        rows = cursor.fetchall()
+                        if not rows:
+                            break
+                        website_ids += [row['website_id'] for row in rows]
+                        self.last_id = rows[-1]['id']
+                finally:
+                    cursor.close()
+        except Error as e:
+            # website_changes doesn't exist until `flask db upgrade`
+            print(f"Error reading website changes: {e}")
+        finally:
+            self._lock.release()
+        return website_ids
+
+
+def invalidate_websites(response_cache, website_ids):
+    # What the lookup-only servers cache about changed websites: their /api bundles, and
+    # every resolved input (a renamed website may no longer match the inputs it did)
+    if website_ids:
+        response_cache.invalidate_website(*website_ids)
+        invalidate_resolver()
+
+
+def cached_website_id(term):
+    # Resolver cache hit for a raw input, without touching the database
+    return resolver_cache.get(term)
+
+
+def invalidate_resolver():
+    # Call after websites are deleted or their name/url change
+    resolver_cache.clear()
+
+
+def fetch_bundles(cursor, website_ids):
+    # The website rows and all seven child tables in a single multi-statement batch
+    website_ids = list(OrderedDict.fromkeys(website_ids))
+    if not website_ids:
+        return {}
+    statements = bundle_statements(website_ids)
+    results = cursor.execute(
+        '; '.join(sql for sql, _ in statements), sum((params for _, params in statements), ()), multi=True
+    )
+    return assemble_bundles([result.fetchall() for result in results])
+
+
+def fetch_website_bundles(conn, terms):
+    # Resolve many names/urls and return {term: bundle or None}: one round trip when every
+    # term is in the resolver cache, otherwise one more to resolve the rest
+    cursor = conn.cursor(dictionary=True)
+    try:
+        website_ids = resolve_website_ids(cursor, terms)
+        bundles = fetch_bundles(cursor, [i for i in website_ids.values() if i is not None])
+    finally:
+        cursor.close()
+    return bundles_by_term(website_ids, bundles)
+
+
+def fetch_website_bundle(conn, term):
+    return fetch_website_bundles(conn, [term]).get(term)
+
+
+def iter_website_bundles(conn, terms, chunk_size=200):
+    # Yield (term, bundle or None) in input order, a few round trips per chunk of terms
+    for start in range(0, len(terms), chunk_size):
+        chunk = terms[start:start + chunk_size]
+        bundles = fetch_website_bundles(conn, chunk)
+        for term in chunk:
+            yield term, bundles.get(term)
+
+
+def stream_website_bundles(conn, terms, dumps, chunk_size=200, fields=None):
+    # Emit a JSON document incrementally so large batches don't sit in memory.
+    # "status" is written last: a failure part-way through still yields valid JSON.
+    # `fields` (from parse_fields) trims every bundle.
+    yield '{"code": 200, "count": %d, "data": [' % len(terms)
+    try:
+        for index, (term, bundle) in enumerate(iter_website_bundles(conn, terms, chunk_size)):
+            data = project_bundle(bundle, fields) if fields and bundle else bundle
+            item = {"search_term": term, "found": bundle is not None, "data": data}
+            yield (', ' if index else '') + dumps(item)
+    except Error as e:
+        yield '], "status": "error", "message": %s}' % dumps(f"Database error: {str(e)}")
+        return
+    yield '], "status": "success"}'
@@ -0,0 +1,125 @@
+from flask import Blueprint, current_app, request, jsonify
+from mysql.connector import Error
+
+from factory import conditional_response
+from lookup import cached_website_id, fetch_website_bundle, parse_fields, project_bundle, stream_website_bundles
+from response_cache import api_envelope, make_entry
+
+bp = Blueprint('lookup', __name__)
+
+
+def get_db_connection():
+    try:
+        connection = current_app.extensions['db_pool'].connect()
+        return connection
+    except Error as e:
+        print(f"Error connecting to MySQL: {e}")
+        return None
+
+@bp.route('/api', methods=['GET'])
+def api_search():
+    website_name = request.args.get('name')
+
+    if not website_name:
+        return jsonify({
+            "status": "error",
+            "message": "Website name parameter is required. Use ?name=website.com",
+            "code": 400
+        }), 400
+
+    # ?fields= trims the bundle (e.g. fields=-*_raw,-*tooltip); the cache keeps whole bundles
+    fields = parse_fields(request.args.get('fields'))
+
+    # Input already resolved and its bundle cached: answer without touching the database
+    response_cache = current_app.extensions['response_cache']
+    dumps = current_app.json.dumps
+    website_id = cached_website_id(website_name)
+    entry = response_cache.get(f'api:{website_id}') if website_id is not None else None
+    if entry is not None:
+        if fields:
+            entry = make_entry(dumps(project_bundle(current_app.json.loads(entry[0]), fields)))
+        return conditional_response(*api_envelope(website_name, entry, dumps), 'application/json')
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({
+            "status": "error",
+            "message": "Database connection failed",
+            "code": 500
+        }), 500
+
+    try:
+        # Canonical host lookup (LRU-cached), then the website and its child tables in one round trip
+        result = fetch_website_bundle(conn, website_name)
+
+        if not result:
+            return jsonify({
+                "status": "error",
+                "message": f"No website found with name: {website_name}",
+                "code": 404,
+                "search_term": website_name
+            }), 404
+
+        entry = response_cache.set(f"api:{result['id']}", dumps(result))
+        if fields:
+            entry = make_entry(dumps(project_bundle(result, fields)))
+        return conditional_response(*api_envelope(website_name, entry, dumps), 'application/json')
+
+    except Error as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Database error: {str(e)}",
+            "code": 500
+        }), 500
+    finally:
+        # Always hand it back: the pool discards a dead connection and frees its slot
+        if conn:
+            conn.close()
+
+@bp.route('/api/batch', methods=['POST'])
+def api_batch():
+    # Accepts a JSON list of names/urls, or {"names": [...], "urls": [...]}
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        names, urls = payload.get('names') or [], payload.get('urls') or []
+        terms = names + urls if isinstance(names, list) and isinstance(urls, list) else None
+    else:
+        terms = payload
+
+    if not terms or not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+        return jsonify({
+            "status": "error",
+            "message": "Request body must be a JSON list of website names, or {\"names\": [...]}",
+            "code": 400
+        }), 400
+
+    terms = [t.strip() for t in terms if t.strip()]
+    max_batch_size = current_app.config['API_BATCH_MAX_SIZE']
+    if len(terms) > max_batch_size:
+        return jsonify({
+            "status": "error",
+            "message": f"At most {max_batch_size} names are allowed per batch",
+            "code": 400
+        }), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({
+            "status": "error",
+            "message": "Database connection failed",
+            "code": 500
+        }), 500
+
+    # Stream the results; the connection goes back to the pool once the response is sent.
+    # ?fields= trims every bundle, as on /api.
+    response = current_app.response_class(
+        stream_website_bundles(conn, terms, current_app.json.dumps, chunk_size=current_app.config['API_BATCH_CHUNK_SIZE'],
+                               fields=parse_fields(request.args.get('fields'))),
+        mimetype='application/json'
+    )
+    response.call_on_close(conn.close)
+    return response
+
+@bp.route('/health', methods=['GET'])
+def health_check():
+    return jsonify({"status": "healthy", "message": "API is running", "pool": current_app.extensions['db_pool'].stats()})
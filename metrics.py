@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import defaultdict
+
+from flask import Blueprint, current_app, request
+
+# Request latency, per-request SQL counts/time and pool gauges, served at /metrics in the
+# Prometheus text format. Statements are reported by SQLAlchemy's cursor events and by the
+# raw connection pool's TimedCursor. Values are per process: with several gunicorn
+# workers each scrape sees the worker that answered it.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+# db_pool.ConnectionPool.stats() keys that only ever grow
+POOL_COUNTERS = {'checkouts', 'connects', 'recycled', 'invalidated', 'waits', 'timeouts'}
+
+bp = Blueprint('metrics', __name__)
+
+# The request being served by this thread, if any. A thread rather than the request
+# context so statements run while a streamed body is generated still count.
+_local = threading.local()
+
+
+class RequestProfile:
+    def __init__(self, max_statements):
+        self.started = time.perf_counter()
+        self.max_statements = max_statements
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = []
+
+    def add(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements.append((seconds, statement))
+        if len(self.statements) > self.max_statements * 2:
+            # Keep the slowest ones
+            self.statements = sorted(self.statements, reverse=True)[:self.max_statements]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self, name, description, label_names):
+        lines = [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, (counts, total, count) in series:
+            base = _labels(label_names, labels)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{base}}} {total}')
+            lines.append(f'{name}_count{{{base}}} {count}')
+        return lines
+
+
+def _labels(names, values):
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    def __init__(self, slow_request_seconds=1.0, max_statements=20):
+        self.slow_request_seconds = slow_request_seconds
+        self.max_statements = max_statements
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_seconds = Histogram(LATENCY_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.requests = defaultdict(int)
+        self.slow_requests = defaultdict(int)
+        self.untracked_queries = 0
+        # Called as observer(endpoint, seconds, profile) after each request (see bench/routes.py)
+        self.observers = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.register_blueprint(bp)
+
+    def start_request(self):
+        _local.profile = RequestProfile(self.max_statements)
+
+    def finish_request(self, response):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return response
+        # Unmatched URLs share one label so scanners can't blow up the series count
+        endpoint = request.endpoint or 'unmatched'
+        method, path, status = request.method, request.full_path.rstrip('?'), response.status_code
+
+        def finish():
+            # After the body is sent, so streamed responses are timed in full
+            _local.profile = None
+            self.observe(profile, endpoint, method, path, status)
+
+        response.call_on_close(finish)
+        return response
+
+    def observe(self, profile, endpoint, method, path, status):
+        seconds = time.perf_counter() - profile.started
+        self.latency.observe((endpoint, method), seconds)
+        self.db_seconds.observe((endpoint,), profile.db_seconds)
+        self.db_queries.observe((endpoint,), profile.queries)
+        with self._lock:
+            self.requests[(endpoint, method, str(status))] += 1
+        for observer in self.observers:
+            observer(endpoint, seconds, profile)
+        if seconds >= self.slow_request_seconds:
+            with self._lock:
+                self.slow_requests[(endpoint,)] += 1
+            statements = sorted(profile.statements, reverse=True)[:self.max_statements]
+            print(f"Slow request: {method} {path} -> {status} in {seconds * 1000:.0f}ms, "
+                  f"{profile.queries} queries, {profile.db_seconds * 1000:.0f}ms in the database")
+            for statement_seconds, statement in statements:
+                print(f"  {statement_seconds * 1000:8.1f}ms  {' '.join(statement.split())[:500]}")
+
+    def render(self, pools):
+        lines = []
+        lines += self.latency.render(
+            'http_request_duration_seconds', 'Time to serve a request, including a streamed body.',
+            ('endpoint', 'method')
+        )
+        lines += self.db_seconds.render(
+            'http_request_db_seconds', 'Time spent in SQL statements per request.', ('endpoint',)
+        )
+        lines += self.db_queries.render(
+            'http_request_db_queries', 'SQL statements executed per request.', ('endpoint',)
+        )
+        with self._lock:
+            requests, slow = sorted(self.requests.items()), sorted(self.slow_requests.items())
+            untracked = self.untracked_queries
+        lines += ['# HELP http_requests_total Requests served.', '# TYPE http_requests_total counter']
+        lines += [f'http_requests_total{{{_labels(("endpoint", "method", "status"), k)}}} {v}' for k, v in requests]
+        lines += ['# HELP http_slow_requests_total Requests slower than SLOW_REQUEST_SECONDS.',
+                  '# TYPE http_slow_requests_total counter']
+        lines += [f'http_slow_requests_total{{{_labels(("endpoint",), k)}}} {v}' for k, v in slow]
+        lines += ['# HELP db_untracked_queries_total SQL statements run outside a request (CLI, background threads).',
+                  '# TYPE db_untracked_queries_total counter', f'db_untracked_queries_total {untracked}']
+
+        # Pool usage, read at scrape time: {pool name: stats()}
+        gauges = defaultdict(list)
+        for pool_name, stats in pools.items():
+            for key, value in stats.items():
+                gauges[key].append((pool_name, value))
+        for key, values in sorted(gauges.items()):
+            name = f'db_pool_{key}' + ('_total' if key in POOL_COUNTERS else '')
+            lines += [f'# TYPE {name} {"counter" if key in POOL_COUNTERS else "gauge"}']
+            lines += [f'{name}{{pool="{pool_name}"}} {value}' for pool_name, value in values]
+        return '\n'.join(lines) + '\n'
+
+
+def record_query(statement, seconds):
+    # Called for every SQL statement; attributed to the request this thread is serving
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.add(statement, seconds)
+    else:
+        metrics = _current_metrics()
+        if metrics is not None:
+            with metrics._lock:
+                metrics.untracked_queries += 1
+
+
+def _current_metrics():
+    try:
+        return current_app.extensions.get('metrics')
+    except RuntimeError:
+        return None
+
+
+def instrument_sqlalchemy():
+    # Time every statement of every SQLAlchemy engine
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if getattr(instrument_sqlalchemy, 'done', False):
+        return
+    instrument_sqlalchemy.done = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_query(statement, time.perf_counter() - conn.info['query_started'].pop())
+
+
+def sqlalchemy_pool_stats(engine):
+    pool = engine.pool
+    stats = {}
+    for key, method in (('open', 'checkedin'), ('checked_out', 'checkedout'), ('overflow', 'overflow'),
+                        ('pool_size', 'size')):
+        if hasattr(pool, method):
+            stats[key] = getattr(pool, method)()
+    if 'overflow' in stats:
+        # QueuePool counts from -pool_size
+        stats['overflow'] = max(stats['overflow'], 0)
+    if 'open' in stats:
+        # checkedin() counts idle connections
+        stats['idle'] = stats['open']
+        stats['open'] += stats.get('checked_out', 0)
+    return stats
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    pools = {}
+    if 'db_pool' in current_app.extensions:
+        pools['mysql'] = current_app.extensions['db_pool'].stats()
+    if 'sqlalchemy' in current_app.extensions:
+        from models import db
+
+        pools['sqlalchemy'] = sqlalchemy_pool_stats(db.engine)
+    body = current_app.extensions['metrics'].render(pools)
+    return current_app.response_class(body, mimetype='text/plain; version=0.0.4')
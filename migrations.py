@@ -0,0 +1,215 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from countries import country_key
+from domains import website_host_key
+from models import (db, ChartRollup, SchemaMigration, Website, WebsiteBadge, WebsiteCategory, WebsiteChange,
+                    WebsiteContrCategory, WebsiteCountry, WebsiteFacet, WebsitePrice, WebsiteSEOMetric,
+                    WebsiteTraffic, WebsiteTrafficGeo)
+
+# Minimal schema migrations. Each migration runs once, in order, and is recorded in
+# schema_migrations. Steps check the live schema first, so they are safe to re-run on
+# databases that were partly set up by hand (or created fresh from the models).
+
+
+def _has_column(conn, table, column):
+    return column in {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def _has_index(conn, table, name):
+    return name in {i['name'] for i in inspect(conn).get_indexes(table)}
+
+
+def _create_index(conn, table, name, columns, unique=False):
+    if not _has_index(conn, table, name):
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        conn.execute(text(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})"))
+
+
+def _drop_index(conn, table, name):
+    if _has_index(conn, table, name):
+        on_table = f' ON {table}' if conn.dialect.name == 'mysql' else ''
+        conn.execute(text(f"DROP INDEX {name}{on_table}"))
+
+
+def _add_column(conn, table, column, ddl):
+    if not _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_tables(conn):
+    # Catalogue tables (normally loaded out-of-band) plus the app's own support tables
+    tables = [model.__table__ for model in (
+        Website, WebsiteBadge, WebsiteCategory, WebsiteContrCategory, WebsitePrice, WebsiteSEOMetric,
+        WebsiteTraffic, WebsiteTrafficGeo, WebsiteCountry, WebsiteFacet, ChartRollup,
+    )]
+    db.metadata.create_all(conn, tables=tables, checkfirst=True)
+
+
+CHILD_TABLES = ['website_badges', 'website_categories', 'website_contr_categories', 'website_prices',
+                'website_seo_metrics', 'website_traffic', 'website_traffic_geo']
+
+LEADERBOARD_METRICS = ['ahrefs_dr', 'ahrefs_traffic', 'da_moz']
+
+
+def lookup_indexes(conn):
+    # Every child-table lookup is WHERE website_id = ...
+    for table in CHILD_TABLES:
+        _create_index(conn, table, f'ix_{table}_website_id', ['website_id'])
+    # /api matches name OR url OR external_url (MySQL merges the three indexes)
+    for column in ('name', 'url', 'external_url'):
+        _create_index(conn, 'websites', f'ix_websites_{column}', [column])
+    _create_index(conn, 'websites', 'ix_websites_language', ['language'])
+    # Category filter and facet
+    _create_index(conn, 'website_categories', 'ix_website_categories_category', ['category_name', 'website_id'])
+    # Leaderboards: ORDER BY metric DESC LIMIT n walks the index backwards
+    for metric in LEADERBOARD_METRICS:
+        _create_index(conn, 'website_seo_metrics', f'ix_website_seo_metrics_{metric}', [metric, 'website_id'])
+
+
+def add_host_key(conn):
+    # Normalised host ("example.com") for domain lookups; 0004 fills it in
+    _add_column(conn, 'websites', 'host_key', 'VARCHAR(255)')
+    _create_index(conn, 'websites', 'ix_websites_host_key', ['host_key'])
+
+
+def backfill_host_keys(conn, chunk_size=5000, key_function=website_host_key):
+    last_id, updated = 0, 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, name, url, external_url FROM websites WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {'last_id': last_id, 'limit': chunk_size}
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE websites SET host_key = :host_key WHERE id = :id"),
+            [{'id': row.id, 'host_key': key_function(row.name, row.url, row.external_url)} for row in rows]
+        )
+        updated += len(rows)
+        last_id = rows[-1].id
+    return updated
+
+
+def unique_host_key(conn, chunk_size=5000):
+    # Recompute host_key with the canonical (IDNA-aware) normaliser, then make it unique.
+    # When several websites share a host the lowest id keeps the key; the others are
+    # left NULL and stay reachable through the name/url/external_url fallback.
+    _drop_index(conn, 'websites', 'ix_websites_host_key')
+    backfill_host_keys(conn, chunk_size)
+    duplicate_ids = [row.id for row in conn.execute(text(
+        "SELECT w.id FROM websites w JOIN ("
+        "SELECT host_key, MIN(id) AS keep_id FROM websites WHERE host_key IS NOT NULL "
+        "GROUP BY host_key HAVING COUNT(*) > 1"
+        ") d ON w.host_key = d.host_key AND w.id <> d.keep_id"
+    )).fetchall()]
+    if duplicate_ids:
+        conn.execute(text("UPDATE websites SET host_key = NULL WHERE id = :id"), [{'id': i} for i in duplicate_ids])
+    _create_index(conn, 'websites', 'ix_websites_host_key', ['host_key'], unique=True)
+
+
+def content_hashes(conn):
+    # Per-website change detection for `flask ingest`; NULL hashes count as changed
+    _add_column(conn, 'websites', 'content_hash', 'VARCHAR(32)')
+    WebsiteChange.__table__.create(conn, checkfirst=True)
+
+
+def country_keys(conn):
+    # Lowercased website_countries.country_key, so country filters match any case on any
+    # collation; it replaces country_name in the lookup index
+    _add_column(conn, 'website_countries', 'country_key', 'VARCHAR(100)')
+    names = [row[0] for row in conn.execute(
+        text("SELECT DISTINCT country_name FROM website_countries WHERE country_key IS NULL")
+    ).fetchall()]
+    if names:
+        conn.execute(text("UPDATE website_countries SET country_key = :key WHERE country_name = :name"),
+                     [{'name': name, 'key': country_key(name)} for name in names])
+    _drop_index(conn, 'website_countries', 'ix_website_countries_lookup')
+    _create_index(conn, 'website_countries', 'ix_website_countries_key', ['country_key', 'kind', 'website_id'])
+
+
+MIGRATIONS = [
+    ('0001_create_tables', 'Create catalogue and support tables', create_tables),
+    ('0002_lookup_indexes', 'Index website_id foreign keys, lookup and sort columns', lookup_indexes),
+    ('0003_host_key', 'Add websites.host_key for normalised domain lookups', add_host_key),
+    ('0004_unique_host_key', 'Canonicalise websites.host_key and make it unique', unique_host_key),
+    ('0005_content_hashes', 'Add websites.content_hash and the website_changes log', content_hashes),
+    ('0006_country_keys', 'Add website_countries.country_key for case-insensitive country filters', country_keys),
+]
+
+
+def applied_migrations():
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    return {row.id for row in SchemaMigration.query.all()}
+
+
+def upgrade(echo=print):
+    applied = applied_migrations()
+    ran = []
+    for migration_id, description, step in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        echo(f"Applying {migration_id}: {description}")
+        with db.engine.begin() as conn:
+            step(conn)
+            conn.execute(SchemaMigration.__table__.insert(), {'id': migration_id, 'applied_at': datetime.utcnow()})
+        ran.append(migration_id)
+    return ran
+
+
+# Hot queries that must stay index-backed: (description, SQL, parameters, needs ordered index)
+HOT_QUERIES = [
+    ('websites by name', "SELECT id FROM websites WHERE name = :v", {'v': 'example.com'}, False),
+    ('websites by url', "SELECT id FROM websites WHERE url = :v", {'v': 'example.com'}, False),
+    ('websites by external_url', "SELECT id FROM websites WHERE external_url = :v", {'v': 'example.com'}, False),
+    ('websites by host_key', "SELECT id FROM websites WHERE host_key = :v", {'v': 'example.com'}, False),
+    ('websites by language', "SELECT id FROM websites WHERE language = :v", {'v': 'en'}, False),
+    ('categories by name', "SELECT website_id FROM website_categories WHERE category_name = :v", {'v': 'News'}, False),
+    ('countries by key', "SELECT website_id FROM website_countries WHERE country_key = :v AND kind = 'country'",
+     {'v': 'india'}, False),
+] + [
+    (f'{table} by website_id', f"SELECT * FROM {table} WHERE website_id = :v", {'v': 1}, False)
+    for table in CHILD_TABLES
+] + [
+    (f'leaderboard by {metric}',
+     f"SELECT website_id FROM website_seo_metrics WHERE {metric} IS NOT NULL ORDER BY {metric} DESC, website_id DESC LIMIT 10",
+     {}, True)
+    for metric in LEADERBOARD_METRICS
+]
+
+
+def _explain_problem(conn, sql, params, ordered):
+    # Returns None if the plan uses an index, otherwise a short description of the plan
+    if conn.dialect.name == 'mysql':
+        plan = conn.execute(text(f"EXPLAIN {sql}"), params).mappings().all()
+        for row in plan:
+            # A usable index the optimizer chose not to use is still a full scan
+            if row['type'] == 'ALL' or (row['table'] and row['key'] is None):
+                return f"full scan of {row['table']}"
+            if ordered and 'filesort' in (row['Extra'] or ''):
+                return f"filesort on {row['table']}"
+        return None
+    plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()]
+    for detail in plan:
+        if detail.startswith('SCAN') and 'INDEX' not in detail:
+            return detail
+        if ordered and 'TEMP B-TREE' in detail:
+            return detail
+    return None
+
+
+def check_indexes():
+    # EXPLAIN every hot query; returns [(description, problem)] for those that lost their index
+    problems = []
+    with db.engine.connect() as conn:
+        for description, sql, params, ordered in HOT_QUERIES:
+            try:
+                problem = _explain_problem(conn, sql, params, ordered)
+            except SQLAlchemyError as e:
+                conn.rollback()
+                problem = f"EXPLAIN failed: {getattr(e, 'orig', e)}"
+            if problem:
+                problems.append((description, problem))
+    return problems
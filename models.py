@@ -1,4 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import selectinload
+
+from domains import website_host_key
 
 db = SQLAlchemy()
 
@@ -6,9 +10,11 @@ class Website(db.Model):
     __tablename__ = 'websites'
     
     id = db.Column(db.BigInteger, primary_key=True)
-    name = db.Column(db.String(255))
-    external_url = db.Column(db.String(500))
-    url = db.Column(db.String(500))
+    name = db.Column(db.String(255), index=True)
+    external_url = db.Column(db.String(500), index=True)
+    url = db.Column(db.String(500), index=True)
+    host_key = db.Column(db.String(255), index=True, unique=True)  # canonical host, see domains.py
+    content_hash = db.Column(db.String(32))  # hash of the row and its child rows, see ingest.py
     placement = db.Column(db.Text)
     is_free_announcement = db.Column(db.Boolean)
     is_paid_announcement = db.Column(db.Boolean)
@@ -22,7 +28,7 @@ class Website(db.Model):
     domain_zone = db.Column(db.String(20))
     cre_type = db.Column(db.String(100))
     speed = db.Column(db.String(50))
-    language = db.Column(db.String(50))
+    language = db.Column(db.String(50), index=True)
     countries = db.Column(db.String(255))
     regions = db.Column(db.String(255))
     amount_total_deals = db.Column(db.String(50))
@@ -35,12 +41,51 @@ class Website(db.Model):
     seo_metrics = db.relationship('WebsiteSEOMetric', backref='website', lazy='dynamic')
     traffic = db.relationship('WebsiteTraffic', backref='website', lazy='dynamic')
     traffic_geo = db.relationship('WebsiteTrafficGeo', backref='website', lazy='dynamic')
+    
+    # Plain-list views of the same relationships. Dynamic relationships can't be
+    # eager loaded, so pages that render every child table use these via preloaded()
+    badge_list = db.relationship('WebsiteBadge', viewonly=True, order_by='WebsiteBadge.id')
+    category_list = db.relationship('WebsiteCategory', viewonly=True, order_by='WebsiteCategory.id')
+    contr_category_list = db.relationship('WebsiteContrCategory', viewonly=True, order_by='WebsiteContrCategory.id')
+    price_list = db.relationship('WebsitePrice', viewonly=True, order_by='WebsitePrice.id')
+    seo_metric_list = db.relationship('WebsiteSEOMetric', viewonly=True, order_by='WebsiteSEOMetric.id')
+    traffic_list = db.relationship('WebsiteTraffic', viewonly=True, order_by='WebsiteTraffic.id')
+    traffic_geo_list = db.relationship('WebsiteTrafficGeo', viewonly=True, order_by='WebsiteTrafficGeo.id')
+    
+    PRELOADED_RELATIONSHIPS = ('badge_list', 'category_list', 'contr_category_list', 'price_list',
+                               'seo_metric_list', 'traffic_list', 'traffic_geo_list')
+    
+    @classmethod
+    def preloaded(cls):
+        # Query that loads every child table with one SELECT ... IN per table,
+        # so rendering a website costs a fixed number of queries
+        return cls.query.options(*[selectinload(getattr(cls, name)) for name in cls.PRELOADED_RELATIONSHIPS])
+    
+    @property
+    def seo_metric(self):
+        # One SEO metrics row per website; works on preloaded instances without a query
+        return self.seo_metric_list[0] if self.seo_metric_list else None
+
+@event.listens_for(Website, 'before_insert')
+@event.listens_for(Website, 'before_update')
+def set_host_key(mapper, connection, website):
+    # host_key is derived on write so rows saved through the ORM always carry the canonical key.
+    # It is unique: as in ingest, a host another website already owns is left NULL here.
+    state = inspect(website)
+    if state.persistent and not any(state.attrs[name].history.has_changes() for name in ('name', 'url', 'external_url')):
+        return
+    key = website_host_key(website.name, website.url, website.external_url)
+    if key is not None:
+        owner = connection.execute(select(Website.id).where(Website.host_key == key)).scalar()
+        if owner not in (None, website.id):
+            key = None
+    website.host_key = key
 
 class WebsiteBadge(db.Model):
     __tablename__ = 'website_badges'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     badge_text = db.Column(db.String(100))
     badge_tooltip = db.Column(db.Text)
     badge_class = db.Column(db.String(100))
@@ -48,24 +93,28 @@ class WebsiteBadge(db.Model):
 class WebsiteCategory(db.Model):
     __tablename__ = 'website_categories'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     category_id = db.Column(db.Integer)
     category_name = db.Column(db.String(100))
+    
+    __table_args__ = (
+        db.Index('ix_website_categories_category', 'category_name', 'website_id'),
+    )
 
 class WebsiteContrCategory(db.Model):
     __tablename__ = 'website_contr_categories'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     contr_id = db.Column(db.Integer)
     contr_name = db.Column(db.String(100))
 
 class WebsitePrice(db.Model):
     __tablename__ = 'website_prices'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     format_id = db.Column(db.Integer)
     title = db.Column(db.String(100))
     price_publication_raw = db.Column(db.Text)
@@ -81,8 +130,8 @@ class WebsitePrice(db.Model):
 class WebsiteSEOMetric(db.Model):
     __tablename__ = 'website_seo_metrics'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     ahrefs_rank_raw = db.Column(db.Text)
     ahrefs_dr_raw = db.Column(db.Text)
     ahrefs_ur_raw = db.Column(db.Text)
@@ -121,12 +170,19 @@ class WebsiteSEOMetric(db.Model):
     tr = db.Column(db.Numeric(12, 2))
     gsc_clicks = db.Column(db.Numeric(12, 2))
     gsc_impressions = db.Column(db.Numeric(12, 2))
+    
+    # Leaderboard sort columns
+    __table_args__ = (
+        db.Index('ix_website_seo_metrics_ahrefs_dr', 'ahrefs_dr', 'website_id'),
+        db.Index('ix_website_seo_metrics_ahrefs_traffic', 'ahrefs_traffic', 'website_id'),
+        db.Index('ix_website_seo_metrics_da_moz', 'da_moz', 'website_id'),
+    )
 
 class WebsiteTraffic(db.Model):
     __tablename__ = 'website_traffic'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     traffic_source = db.Column(db.String(50))
     value_raw = db.Column(db.Text)
     value_clean = db.Column(db.Numeric(12, 2))
@@ -134,8 +190,54 @@ class WebsiteTraffic(db.Model):
 class WebsiteTrafficGeo(db.Model):
     __tablename__ = 'website_traffic_geo'
     
-    id = db.Column(db.BigInteger, primary_key=True)
-    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'))
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), index=True)
     country_name = db.Column(db.String(100))
     percent_raw = db.Column(db.Text)
-    percent_clean = db.Column(db.Numeric(6, 2))
\ No newline at end of file
+    percent_clean = db.Column(db.Numeric(6, 2))
+
+class WebsiteCountry(db.Model):
+    __tablename__ = 'website_countries'
+    
+    # One row per entry of websites.countries / websites.regions, kept in sync by countries.py
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    website_id = db.Column(db.BigInteger, db.ForeignKey('websites.id'), nullable=False, index=True)
+    country_name = db.Column(db.String(100), nullable=False)
+    country_key = db.Column(db.String(100))  # lowercased country_name, see countries.country_key
+    kind = db.Column(db.String(10), nullable=False, default='country')  # 'country' or 'region'
+    
+    __table_args__ = (
+        db.Index('ix_website_countries_key', 'country_key', 'kind', 'website_id'),
+    )
+
+class WebsiteFacet(db.Model):
+    __tablename__ = 'website_facets'
+    
+    # Precomputed filter dropdown values, rebuilt by `flask refresh-facets`
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    facet = db.Column(db.String(20), index=True)
+    value = db.Column(db.String(255))
+
+class ChartRollup(db.Model):
+    __tablename__ = 'chart_rollups'
+    
+    # Precomputed chart payloads (JSON), rebuilt by `flask refresh-rollups`
+    name = db.Column(db.String(100), primary_key=True)
+    payload = db.Column(db.Text().with_variant(db.Text(length=2 ** 24), 'mysql'), nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+class WebsiteChange(db.Model):
+    __tablename__ = 'website_changes'
+    
+    # Change log written by `flask ingest`; web processes follow it to drop cached entries
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    website_id = db.Column(db.BigInteger, nullable=False)
+    change = db.Column(db.String(10), nullable=False)  # 'insert', 'update' or 'delete'
+    changed_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+    
+    # Applied migrations, see migrations.py
+    id = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, nullable=False)
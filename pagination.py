@@ -0,0 +1,118 @@
+import base64
+import binascii
+import json
+from math import ceil
+
+
+def encode_cursor(direction, key):
+    # Opaque, URL-safe token for "rows after/before this key"
+    raw = json.dumps({'d': direction, 'k': key}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    # Returns (direction, key), or None for a missing or malformed token
+    if not token:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        direction, key = data['d'], data['k']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+    if direction not in ('after', 'before') or not isinstance(key, int):
+        return None
+    return direction, key
+
+
+class Page:
+    # One page of results. Exposes the same attributes as Flask-SQLAlchemy's Pagination
+    # that website_list.html uses, plus keyset cursors. `total` is None in count-free mode.
+
+    def __init__(self, items, per_page, page=None, has_prev=False, has_next=False,
+                 prev_cursor=None, next_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.total = None
+        self.total_is_estimate = False
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.page and self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.page and self.has_next else None
+
+    @property
+    def pages(self):
+        if self.total is not None and not self.total_is_estimate:
+            return max(ceil(self.total / self.per_page), 1)
+        # Unknown total: offer pages up to the next one
+        return (self.page or 0) + (1 if self.has_next else 0)
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=5, right_edge=2):
+        # Same shape as Pagination.iter_pages: page numbers with None marking gaps
+        if not self.page:
+            return
+        pages_end = self.pages + 1
+        left_end = min(1 + left_edge, pages_end)
+        yield from range(1, left_end)
+        if left_end == pages_end:
+            return
+        mid_start = max(left_end, self.page - left_current)
+        mid_end = min(self.page + right_current + 1, pages_end)
+        if mid_start - left_end > 0:
+            yield None
+        yield from range(mid_start, mid_end)
+        if mid_end == pages_end:
+            return
+        right_start = max(mid_end, pages_end - right_edge)
+        if right_start - mid_end > 0:
+            yield None
+        yield from range(right_start, pages_end)
+
+
+def paginate_offset(query, page, per_page):
+    # Classic page numbers; fetches one extra row instead of counting to know if there's more
+    page = max(page, 1)
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return Page(rows[:per_page], per_page, page=page, has_prev=page > 1, has_next=len(rows) > per_page)
+
+
+def paginate_keyset(query, key_column, per_page, cursor):
+    # Seek on key_column instead of OFFSET, so deep pages cost the same as the first
+    direction, key = cursor
+    query = query.order_by(None)
+    if direction == 'before':
+        rows = query.filter(key_column < key).order_by(key_column.desc()).limit(per_page + 1).all()
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = len(rows) > per_page, True
+    else:
+        rows = query.filter(key_column > key).order_by(key_column).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_prev, has_next = True, len(rows) > per_page
+
+    result = Page(items, per_page, has_prev=has_prev and bool(items), has_next=has_next and bool(items))
+    if items:
+        if result.has_prev:
+            result.prev_cursor = encode_cursor('before', getattr(items[0], key_column.key))
+        if result.has_next:
+            result.next_cursor = encode_cursor('after', getattr(items[-1], key_column.key))
+    return result
+
+
+def count_total(query, mode, estimate_cap):
+    # 'exact' counts everything, 'estimate' stops counting at estimate_cap, 'none' skips it.
+    # Returns (total, is_estimate).
+    query = query.order_by(None)
+    if mode == 'none':
+        return None, False
+    if mode == 'estimate':
+        total = query.limit(estimate_cap + 1).count()
+        return min(total, estimate_cap), total > estimate_cap
+    return query.count(), False
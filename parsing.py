@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, select, update
+
+from changes import record_changes
+from models import db
+
+# `*_raw` text column -> parsed numeric column, per table
+RAW_COLUMNS = {
+    'website_prices': [
+        ('price_publication_raw', 'price_publication'),
+        ('price_publication_old_raw', 'price_publication_old'),
+        ('publication_with_contr_categories_raw', 'publication_with_contr_categories'),
+        ('price_spelling_raw', 'price_spelling'),
+    ],
+    'website_seo_metrics': [(f'{metric}_raw', metric) for metric in (
+        'ahrefs_rank', 'ahrefs_dr', 'ahrefs_ur', 'ahrefs_backlinks', 'ahrefs_refdomains', 'ahrefs_keywords',
+        'ahrefs_traffic', 'serpstat_domain_rank', 'serpstat_referring_domains', 'serpstat_referring_links',
+        'tf', 'cf', 'da_moz', 'majestic_links', 'majestic_ref_domains', 'google_index', 'tr',
+        'gsc_clicks', 'gsc_impressions',
+    )],
+    'website_traffic': [('value_raw', 'value_clean')],
+    'website_traffic_geo': [('percent_raw', 'percent_clean')],
+}
+
+# Largest value each parsed column can store (Numeric(12, 2), percent_clean is Numeric(6, 2))
+MAX_VALUE = {'percent_clean': 9999.99}
+DEFAULT_MAX_VALUE = 9999999999.99
+
+SUFFIX_MULTIPLIERS = {'k': 1e3, 'm': 1e6, 'b': 1e9}
+WORD_MULTIPLIERS = {
+    'тыс': 1e3, 'thousand': 1e3, 'млн': 1e6, 'mln': 1e6, 'million': 1e6, 'млрд': 1e9, 'bn': 1e9, 'billion': 1e9,
+}
+
+# Patterns below are run by both Arrow's RE2 and Python's re, so letters are spelled out
+# (RE2's \w is ASCII-only): Latin, Latin-1 and Cyrillic, lowercase
+LETTERS = 'a-zß-öø-ÿа-яёєіїґ'
+# Stripped around the number: currency symbols, percent and plus signs
+DECORATION = '[$€£¥₽₹₴₸₺₩₪฿₫%+]'
+# Any whitespace, including the no-break and thin spaces used to group thousands
+SPACES = '[\\s\u00a0\u2009\u202f]+'
+# The number shapes accepted, in order of precedence. Group separators must group in
+# threes, so "1.2.3" or "1,23.5" are unparseable rather than read as 123 or 123.5.
+SPACE_GROUPED = r'-?[0-9]{1,3}(?: [0-9]{3})+(?:[.,][0-9]*)?'   # "12 345", "1 234,56"
+PLAIN = r'-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)'                      # "1200", "12.5", "1.234"
+COMMA_GROUPED = r'-?[0-9]{1,3}(?:,[0-9]{3})+(?:\.[0-9]*)?'     # "1,200", "1,234.56"
+DOT_GROUPED = r'-?[0-9]{1,3}(?:\.[0-9]{3})+(?:,[0-9]*)?'       # "1.234.567", "1.234,56"
+COMMA_DECIMAL = r'-?[0-9]+,[0-9]+'                              # "12,5"
+
+# Arrow-backed strings run the .str operations below in Arrow's vectorised kernels;
+# without pyarrow pandas falls back to its own (slower) string dtype
+try:
+    import pyarrow  # noqa: F401
+
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = 'string'
+
+
+def parse_numeric(values):
+    # Whole-column parse of scraped text into float64; unparseable values become NaN.
+    # Scraped columns repeat a lot ("N/A", common prices), so each distinct string is
+    # parsed once and the results are broadcast back.
+    values = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    parsed = _parse_unique(uniques)
+    result = np.full(len(codes), np.nan)
+    found = codes >= 0
+    result[found] = parsed[codes[found]]
+    return pd.Series(result, index=values.index)
+
+
+def _parse_unique(values):
+    # Handles currency symbols and codes ("$1,200", "100 руб", "€ 99"), K/M/B suffixes and
+    # multiplier words ("1.2K", "3M", "1.5 млн"), percentages ("45%"), space/comma/dot
+    # thousands separators and decimal commas ("1.234,56", "12,5"). Anything else left
+    # over ("1e3", "1/2", "1 a 2") is unparseable. Returns a float64 ndarray.
+    text = pd.Series(values, dtype=object).astype(STRING_DTYPE).str.lower().str.replace(SPACES, ' ', regex=True)
+
+    multiplier = pd.Series(1.0, index=text.index)
+    for word, factor in WORD_MULTIPLIERS.items():
+        found = text.str.contains(f'(?:^|[^{LETTERS}]){word}(?:[^{LETTERS}]|$)', regex=True).fillna(False)
+        multiplier = multiplier.mask(found.astype(bool), factor)
+    # Drop words (currency codes, units) but keep single-letter suffixes
+    text = text.str.replace(f'[{LETTERS}]{{2,}}\\.?', '', regex=True).str.replace(DECORATION, '', regex=True).str.strip()
+    for suffix, factor in SUFFIX_MULTIPLIERS.items():
+        multiplier = multiplier.mask(text.str.endswith(suffix).fillna(False).astype(bool), multiplier * factor)
+    text = text.str.replace(r'[kmb]$', '', regex=True).str.strip()
+    text = text.mask(text.str.fullmatch(SPACE_GROUPED).fillna(False).astype(bool), text.str.replace(' ', '', regex=False))
+
+    plain = text.str.fullmatch(PLAIN).fillna(False).astype(bool)
+    comma_grouped = ~plain & text.str.fullmatch(COMMA_GROUPED).fillna(False).astype(bool)
+    dot_grouped = ~plain & ~comma_grouped & text.str.fullmatch(DOT_GROUPED).fillna(False).astype(bool)
+    comma_decimal = ~plain & ~comma_grouped & ~dot_grouped & text.str.fullmatch(COMMA_DECIMAL).fillna(False).astype(bool)
+    numbers = text.where(plain)
+    numbers = numbers.mask(comma_grouped, text.str.replace(',', '', regex=False))
+    numbers = numbers.mask(dot_grouped, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    numbers = numbers.mask(comma_decimal, text.str.replace(',', '.', regex=False))
+    return (numbers.astype('float64') * multiplier).to_numpy(dtype='float64', na_value=np.nan)
+
+
+def parse_raw_columns(frame, table):
+    # Derive each parsed column from its `*_raw` partner. Where there is no raw text a
+    # parsed value already in the frame is kept; values that don't fit the column are dropped.
+    for raw, clean in RAW_COLUMNS.get(table, []):
+        if raw in frame:
+            parsed = parse_numeric(frame[raw])
+            has_raw = frame[raw].notna()
+        else:
+            parsed = pd.Series(np.nan, index=frame.index)
+            has_raw = pd.Series(False, index=frame.index)
+        if clean in frame:
+            given = pd.to_numeric(frame[clean], errors='coerce').astype('float64')
+            parsed = parsed.where(has_raw, given)
+        limit = MAX_VALUE.get(clean, DEFAULT_MAX_VALUE)
+        frame[clean] = parsed.round(2).where(parsed.abs() <= limit)
+    return frame
+
+
+def backfill_parsed_columns(chunk_size=5000):
+    # Recompute every parsed column from its `*_raw` partner, walking each table by id.
+    # Only rows whose values change are written, and their websites are logged in
+    # website_changes. Returns ({table: rows updated}, {website ids changed}).
+    updated, website_ids = {}, set()
+    for table_name, pairs in RAW_COLUMNS.items():
+        table = db.metadata.tables[table_name]
+        raw_columns = [raw for raw, _ in pairs]
+        clean_columns = [clean for _, clean in pairs]
+        statement = update(table).where(table.c.id == bindparam('row_id')).values(
+            {clean: bindparam(clean) for clean in clean_columns}
+        )
+        updated[table_name], last_id = 0, 0
+        while True:
+            with db.engine.begin() as conn:
+                rows = conn.execute(
+                    select(table.c.id, table.c.website_id, *[table.c[c] for c in raw_columns + clean_columns])
+                    .where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                frame = pd.DataFrame.from_records(rows, columns=['id', 'website_id'] + raw_columns + clean_columns)
+                old = frame[clean_columns].astype('float64')
+                new = parse_raw_columns(frame.copy(), table_name)[clean_columns]
+                changed = ~((new == old) | (new.isna() & old.isna())).all(axis=1)
+                if not changed.any():
+                    continue
+                new = new[changed].astype(object)
+                new = new.where(new.notna(), None)
+                conn.execute(statement, [
+                    {'row_id': int(row_id), **dict(zip(clean_columns, values))}
+                    for row_id, values in zip(frame['id'][changed], new.itertuples(index=False, name=None))
+                ])
+                changed_websites = {int(w) for w in frame['website_id'][changed] if w is not None}
+                record_changes(conn, [(website_id, 'update') for website_id in sorted(changed_websites)])
+                updated[table_name] += int(changed.sum())
+                website_ids |= changed_websites
+    return updated, website_ids
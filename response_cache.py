@@ -0,0 +1,174 @@
+import hashlib
+
+from cache import TTLCache
+
+# Rendered response bodies for /api lookups and website detail pages, keyed by website id
+# ("api:<id>", "detail:<id>") so a change to one website drops exactly its entries.
+# Entries are stored as b"<etag>\n<body>" so every backend only has to hold bytes.
+
+
+class MemoryBackend:
+    # In-process LRU bounded by entry count and age; each worker process has its own
+
+    def __init__(self, ttl=300, maxsize=1000):
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.invalidate(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RedisBackend:
+    # Any Redis-compatible server, shared by all workers. Needs the redis package.
+    # Cache errors are logged and treated as misses so Redis being down never fails a request.
+
+    def __init__(self, url, ttl=300, prefix='collaborator:response:'):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._errors = (redis.RedisError,)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            return self._client.get(self.prefix + key)
+        except self._errors as e:
+            print(f"Response cache error: {e}")
+            return None
+
+    def set(self, key, value):
+        # Same ttl meaning as TTLCache: 0 stores nothing
+        if self.ttl == 0:
+            return
+        try:
+            self._client.set(self.prefix + key, value, ex=self.ttl)
+        except self._errors as e:
+            print(f"Response cache error: {e}")
+
+    def delete(self, *keys):
+        try:
+            self._client.delete(*[self.prefix + key for key in keys])
+        except self._errors as e:
+            print(f"Response cache error: {e}")
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(match=self.prefix + '*', count=1000))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors as e:
+            print(f"Response cache error: {e}")
+
+
+class NullBackend:
+    # RESPONSE_CACHE_BACKEND=none: every lookup misses, ETags still work
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def create_backend(kind='memory', url=None, ttl=300, maxsize=1000):
+    if kind == 'none':
+        return NullBackend()
+    if kind == 'redis':
+        try:
+            return RedisBackend(url or 'redis://localhost:6379/0', ttl=ttl)
+        except ImportError:
+            print("Response cache: the redis package is not installed, using the in-process cache")
+    return MemoryBackend(ttl=ttl, maxsize=maxsize)
+
+
+def make_etag(body):
+    # Strong validator: changes whenever the bytes do
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def make_entry(body):
+    # (body bytes, etag) as ResponseCache.get() returns it, for bodies that aren't cached
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return body, make_etag(body)
+
+
+def api_envelope(search_term, entry, dumps):
+    # /api success body around a cached bundle; the raw search term is echoed per request
+    data, data_etag = entry
+    body = (b'{"code": 200, "data": ' + data + b', "search_term": ' + dumps(search_term).encode('utf-8')
+            + b', "status": "success"}')
+    return body, make_etag(f'{data_etag}:{search_term}'.encode('utf-8'))
+
+
+class ResponseCache:
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, key):
+        # (body, etag) or None
+        value = self.backend.get(key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b'\n')
+        return body, etag.decode('ascii')
+
+    def set(self, key, body):
+        body, etag = make_entry(body)
+        self.backend.set(key, etag.encode('ascii') + b'\n' + body)
+        return body, etag
+
+    def invalidate_website(self, *website_ids):
+        keys = [f'{kind}:{website_id}' for website_id in website_ids for kind in ('api', 'detail')]
+        if keys:
+            self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def invalidate_on_commit(cache, website_model):
+    # Drop cached responses for websites whose row or child rows were changed through the
+    # ORM. Ids are collected at flush and invalidated only once the transaction commits,
+    # so a concurrent request can't re-cache the old data in between. Bulk/raw SQL writes
+    # must call cache.invalidate_website() themselves.
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    def changed_ids(session):
+        return session.info.setdefault('response_cache_website_ids', set())
+
+    @event.listens_for(Session, 'after_flush')
+    def collect(session, flush_context):
+        ids = changed_ids(session)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            website_id = obj.id if isinstance(obj, website_model) else getattr(obj, 'website_id', None)
+            if website_id is not None:
+                ids.add(website_id)
+
+    @event.listens_for(Session, 'after_commit')
+    def invalidate(session):
+        ids = session.info.pop('response_cache_website_ids', None)
+        if ids:
+            cache.invalidate_website(*ids)
+
+    @event.listens_for(Session, 'after_rollback')
+    def discard(session):
+        session.info.pop('response_cache_website_ids', None)
@@ -0,0 +1,130 @@
+import json
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import TTLCache
+from leaderboards import SEO_METRICS, top_websites
+from models import db, ChartRollup, WebsitePrice, WebsiteSEOMetric, WebsiteTrafficGeo
+
+# Websites kept per metric leaderboard; /api/seo_metrics serves limits up to this from the rollup
+ROLLUP_TOP_N = 100
+
+PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+
+# Histogram bin edges per distribution; the last bin is open-ended
+DISTRIBUTION_BINS = {
+    'ahrefs_dr': [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+    'da_moz': [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+    'ahrefs_traffic': [0, 100, 1000, 10000, 100000, 1000000, 10000000],
+}
+PRICE_BINS = [0, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Rollup rows are tiny; keep the decoded payloads in memory between refreshes
+rollup_cache = TTLCache(ttl=60)
+
+
+def _distribution(values, edges):
+    import numpy as np
+
+    values = np.asarray(values, dtype='float64')
+    bins = list(edges) + [np.inf]
+    counts, _ = np.histogram(values, bins=bins)
+    labels = [f'{lo:g}-{hi:g}' for lo, hi in zip(edges, edges[1:])] + [f'{edges[-1]:g}+']
+    return {
+        'count': int(values.size),
+        'bins': labels,
+        'counts': counts.tolist(),
+        'percentiles': {
+            f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        } if values.size else {},
+        'mean': float(values.mean()) if values.size else None,
+    }
+
+
+def _column_values(column):
+    return [float(v) for (v,) in db.session.query(column).filter(column.isnot(None)).all()]
+
+
+def _country_traffic():
+    # Each website's ahrefs_traffic split across countries by its traffic_geo percentages.
+    # Websites without traffic still count towards `websites`.
+    import pandas as pd
+
+    geo = pd.DataFrame.from_records(
+        db.session.query(WebsiteTrafficGeo.website_id, WebsiteTrafficGeo.country_name, WebsiteTrafficGeo.percent_clean)
+        .filter(WebsiteTrafficGeo.country_name.isnot(None), WebsiteTrafficGeo.percent_clean.isnot(None)).all(),
+        columns=['website_id', 'country', 'percent']
+    )
+    traffic = pd.DataFrame.from_records(
+        db.session.query(WebsiteSEOMetric.website_id, WebsiteSEOMetric.ahrefs_traffic)
+        .filter(WebsiteSEOMetric.ahrefs_traffic.isnot(None)).all(),
+        columns=['website_id', 'traffic']
+    ).drop_duplicates('website_id')
+    if geo.empty:
+        return {'countries': [], 'websites': [], 'traffic': [], 'share': []}
+
+    geo = geo.merge(traffic, on='website_id', how='left')
+    geo['estimated'] = geo['percent'].astype('float64') / 100 * geo['traffic'].astype('float64').fillna(0)
+    by_country = geo.groupby('country').agg(websites=('website_id', 'nunique'), traffic=('estimated', 'sum'))
+    by_country = by_country.sort_values(['traffic', 'websites'], ascending=False)
+    total = by_country['traffic'].sum()
+    share = (by_country['traffic'] / total * 100) if total else by_country['traffic'] * 0
+    return {
+        'countries': by_country.index.tolist(),
+        'websites': by_country['websites'].astype(int).tolist(),
+        'traffic': by_country['traffic'].round(2).tolist(),
+        'share': share.round(2).tolist(),
+    }
+
+
+def compute_rollups():
+    rollups = {f'top:{metric}': top_websites(metric, ROLLUP_TOP_N) for metric in SEO_METRICS}
+    for metric, edges in DISTRIBUTION_BINS.items():
+        rollups[f'distribution:{metric}'] = _distribution(_column_values(getattr(WebsiteSEOMetric, metric)), edges)
+    rollups['prices'] = _distribution(_column_values(WebsitePrice.price_publication), PRICE_BINS)
+    rollups['country_traffic'] = _country_traffic()
+    return rollups
+
+
+def refresh_rollups():
+    # Recompute every rollup and swap them in within one transaction
+    ChartRollup.__table__.create(db.engine, checkfirst=True)
+    rollups = compute_rollups()
+    refreshed_at = datetime.utcnow()
+    ChartRollup.query.delete()
+    db.session.add_all(
+        ChartRollup(name=name, payload=json.dumps(payload), refreshed_at=refreshed_at)
+        for name, payload in rollups.items()
+    )
+    db.session.commit()
+    rollup_cache.clear()
+    return rollups
+
+
+def _load_rollup(name):
+    try:
+        row = db.session.get(ChartRollup, name)
+    except SQLAlchemyError:
+        # chart_rollups doesn't exist until the first refresh
+        db.session.rollback()
+        return None
+    if row is None:
+        return None
+    return {'data': json.loads(row.payload), 'refreshed_at': row.refreshed_at.isoformat() + 'Z'}
+
+
+def get_rollup(name):
+    # Primary-key read of one precomputed payload (None if the rollups were never refreshed).
+    # None isn't cached, so a refresh in another process shows up on the next request.
+    return rollup_cache.get_or_set(name, lambda: _load_rollup(name), cache_none=False)
+
+
+def get_top_from_rollup(metric, limit):
+    # Leaderboard slice from the precomputed top-N, or None if it can't answer this limit
+    if limit > ROLLUP_TOP_N:
+        return None
+    rollup = get_rollup(f'top:{metric}')
+    if rollup is None:
+        return None
+    return {key: values[:limit] for key, values in rollup['data'].items()}
@@ -0,0 +1,258 @@
+import bisect
+import threading
+import time
+
+from models import db, Website
+
+NGRAM = 3
+
+
+def normalize_key(value):
+    # Lowercase and drop scheme, "www." and trailing slashes so "https://www.Example.com/"
+    # and "example.com" index (and query) the same way
+    value = (value or '').strip().lower()
+    for scheme in ('https://', 'http://'):
+        if value.startswith(scheme):
+            value = value[len(scheme):]
+    if value.startswith('www.'):
+        value = value[4:]
+    return value.rstrip('/')
+
+
+# What normalize_key() drops from the front of a url
+STRIPPED_PREFIXES = ('https://www.', 'http://www.', 'https://', 'http://')
+
+
+def touches_stripped(value):
+    # True when `value` could match a url only through the scheme or "www." that the
+    # index drops ("https", "www", "s://ex"), so the index can't answer it. A full
+    # leading "https://www." is dropped from the query as well and is fine.
+    value = normalize_key(value)
+    return any(value in prefix or any(prefix.endswith(value[:i]) for i in range(1, len(value) + 1))
+               for prefix in STRIPPED_PREFIXES)
+
+
+def ngrams(value):
+    return {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+
+class SearchIndex:
+    # In-process inverted index over website names and hosts.
+    #
+    # Substring queries of NGRAM+ characters intersect trigram posting sets and then
+    # verify the candidates, so results match the old ILIKE '%q%' semantics without a
+    # table scan. Shorter queries (and typeahead) use a sorted key list for prefix search.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}        # website_id -> (name, url, keys)
+        self._postings = {}    # trigram -> set(website_id)
+        self._prefix = []      # sorted [(key, website_id)]
+        self.max_id = 0
+        self.refreshed_at = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _add(self, website_id, name, url, external_url, keep_sorted=True):
+        keys = []
+        for value in (name, url, external_url):
+            key = normalize_key(value)
+            if key and key not in keys:
+                keys.append(key)
+        self._docs[website_id] = (name, url, keys)
+        for key in keys:
+            for gram in ngrams(key):
+                self._postings.setdefault(gram, set()).add(website_id)
+            if keep_sorted:
+                bisect.insort(self._prefix, (key, website_id))
+            else:
+                self._prefix.append((key, website_id))
+        self.max_id = max(self.max_id, website_id)
+
+    def _remove(self, website_id):
+        doc = self._docs.pop(website_id, None)
+        if not doc:
+            return
+        for key in doc[2]:
+            for gram in ngrams(key):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(website_id)
+                    if not postings:
+                        del self._postings[gram]
+            pos = bisect.bisect_left(self._prefix, (key, website_id))
+            if pos < len(self._prefix) and self._prefix[pos] == (key, website_id):
+                del self._prefix[pos]
+
+    def build(self, rows):
+        # Rebuild from (id, name, url, external_url) rows; searches keep using the old
+        # index until the new one is swapped in
+        fresh = SearchIndex()
+        for row in rows:
+            fresh._add(*row, keep_sorted=False)
+        fresh._prefix.sort()
+        fresh.refreshed_at = time.monotonic()
+        with self._lock:
+            self._docs, self._postings, self._prefix = fresh._docs, fresh._postings, fresh._prefix
+            self.max_id, self.refreshed_at = fresh.max_id, fresh.refreshed_at
+
+    def update(self, rows):
+        # Add or replace individual websites
+        with self._lock:
+            for row in rows:
+                self._remove(row[0])
+                self._add(*row)
+
+    def remove(self, website_ids):
+        with self._lock:
+            for website_id in website_ids:
+                self._remove(website_id)
+
+    def _prefix_matches(self, query, limit=None):
+        matches, seen = [], set()
+        with self._lock:
+            pos = bisect.bisect_left(self._prefix, (query,))
+            while pos < len(self._prefix) and self._prefix[pos][0].startswith(query):
+                website_id = self._prefix[pos][1]
+                if website_id not in seen:
+                    seen.add(website_id)
+                    matches.append(website_id)
+                    if limit and len(matches) >= limit:
+                        break
+                pos += 1
+        return matches
+
+    def _rank(self, query, website_id):
+        # 0: exact name/host, 1: prefix, 2: starts a label ("shop" in "my-shop.com"), 3: substring
+        name, _, keys = self._docs[website_id]
+        best = 3
+        for key in keys:
+            if key == query:
+                return (0, len(name or ''), website_id)
+            if key.startswith(query):
+                best = min(best, 1)
+            elif any(key[i - 1] in '.-_/ ' and key.startswith(query, i) for i in range(1, len(key))):
+                best = min(best, 2)
+        return (best, len(name or ''), website_id)
+
+    def search(self, query, limit=None):
+        # Returns (ranked website ids, truncated). When more than `limit` websites match,
+        # or the query is too short to answer from trigrams, `truncated` is True and the
+        # ids are only a sample.
+        if touches_stripped(query):
+            return [], True
+        query = normalize_key(query)
+
+        with self._lock:
+            if len(query) < NGRAM:
+                # Too short for trigrams: only prefix matches, which isn't the full answer
+                return self._prefix_matches(query, limit), True
+            else:
+                posting_sets = []
+                for gram in ngrams(query):
+                    postings = self._postings.get(gram)
+                    if not postings:
+                        return [], False
+                    posting_sets.append(postings)
+                posting_sets.sort(key=len)
+                candidates = set(posting_sets[0]).intersection(*posting_sets[1:])
+                matches = []
+                for website_id in candidates:
+                    if any(query in key for key in self._docs[website_id][2]):
+                        matches.append(website_id)
+                        # Over the limit the caller falls back to SQL, so stop here
+                        if limit and len(matches) > limit:
+                            return matches[:limit], True
+            if limit and len(matches) > limit:
+                return matches[:limit], True
+            matches.sort(key=lambda website_id: self._rank(query, website_id))
+        return matches, False
+
+    def suggest(self, query, limit=10):
+        # Typeahead: prefix matches first, then ranked substring matches
+        query = normalize_key(query)
+        if not query:
+            return []
+        ids = self._prefix_matches(query, limit)
+        if len(ids) < limit and len(query) >= NGRAM:
+            for website_id in self.search(query, limit * 2)[0]:
+                if website_id not in ids:
+                    ids.append(website_id)
+                if len(ids) >= limit:
+                    break
+        with self._lock:
+            return [
+                {'id': website_id, 'name': self._docs[website_id][0], 'url': self._docs[website_id][1]}
+                for website_id in ids if website_id in self._docs
+            ]
+
+
+search_index = SearchIndex()
+_refresh_lock = threading.Lock()
+_refresher = None
+
+
+def _load_rows(min_id=None, chunk_size=10000):
+    # Stream (id, name, url, external_url) in id order without hydrating Website objects
+    last_id = min_id or 0
+    while True:
+        chunk = db.session.query(Website.id, Website.name, Website.url, Website.external_url).filter(
+            Website.id > last_id).order_by(Website.id).limit(chunk_size).all()
+        if not chunk:
+            break
+        yield from (tuple(row) for row in chunk)
+        last_id = chunk[-1][0]
+
+
+def refresh_search_index(full=False):
+    # Full rebuild, or pick up websites added since the last refresh
+    with _refresh_lock:
+        if full or search_index.refreshed_at is None:
+            search_index.build(_load_rows())
+        else:
+            search_index.update(list(_load_rows(min_id=search_index.max_id)))
+            search_index.refreshed_at = time.monotonic()
+    return search_index
+
+
+def apply_search_changes(website_ids):
+    # Re-read just these websites into an already built index (edits and deletes included)
+    if search_index.refreshed_at is None:
+        return
+    website_ids = list(website_ids)
+    rows = [tuple(row) for row in db.session.query(Website.id, Website.name, Website.url, Website.external_url)
+            .filter(Website.id.in_(website_ids)).all()]
+    with _refresh_lock:
+        search_index.remove(set(website_ids) - {row[0] for row in rows})
+        search_index.update(rows)
+
+
+def _refresh_loop(app):
+    last_full = time.monotonic()
+    while True:
+        time.sleep(app.config['SEARCH_REFRESH_INTERVAL'])
+        full = time.monotonic() - last_full > app.config['SEARCH_REBUILD_INTERVAL']
+        try:
+            with app.app_context():
+                refresh_search_index(full=full)
+                db.session.remove()
+            if full:
+                last_full = time.monotonic()
+        except Exception as e:
+            print(f"Error refreshing search index: {e}")
+
+
+def get_search_index(app):
+    # Built on first use; afterwards a daemon thread picks up new websites every
+    # SEARCH_REFRESH_INTERVAL seconds and rebuilds fully every SEARCH_REBUILD_INTERVAL
+    # (which also drops edited and deleted rows)
+    global _refresher
+    if search_index.refreshed_at is None:
+        refresh_search_index(full=True)
+    if _refresher is None:
+        with _refresh_lock:
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, args=(app,), daemon=True)
+                _refresher.start()
+    return search_index
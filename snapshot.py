@@ -0,0 +1,289 @@
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func, select, type_coerce
+
+from cache import TTLCache
+from models import db, Website, WebsitePrice, WebsiteSEOMetric
+
+# Per-website numbers the /websites metric filters and /api/websites/query can range-filter
+# and sort on. SEO values come from the website's first website_seo_metrics row (as on the
+# detail page); `price` is its cheapest price_publication across formats.
+SEO_COLUMNS = ['ahrefs_dr', 'ahrefs_ur', 'ahrefs_traffic', 'ahrefs_refdomains', 'ahrefs_backlinks',
+               'ahrefs_keywords', 'da_moz', 'tf', 'cf', 'serpstat_domain_rank']
+SNAPSHOT_COLUMNS = SEO_COLUMNS + ['price', 'count_review']
+
+# Sort orders (permutations of the whole snapshot) kept per snapshot, by sort spec
+ORDER_CACHE_SIZE = 16
+
+
+class CatalogueSnapshot:
+    # Columnar copy of SNAPSHOT_COLUMNS: `ids` is sorted and every column is a float64
+    # array aligned with it, NaN where the website has no value. Never modified once built;
+    # refreshes swap in a new snapshot, so queries don't lock.
+
+    def __init__(self, ids, columns):
+        self.ids = ids
+        self.columns = columns
+        self.built_at = time.monotonic()
+        self._orders = TTLCache(ttl=None, maxsize=ORDER_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    def positions(self, website_ids):
+        # -> (positions, found) of website_ids in self.ids
+        website_ids = np.asarray(website_ids, dtype='int64')
+        positions = np.minimum(np.searchsorted(self.ids, website_ids), max(len(self.ids) - 1, 0))
+        found = self.ids[positions] == website_ids if len(self.ids) else np.zeros(len(website_ids), bool)
+        return positions, found
+
+    def mask(self, ranges):
+        # Websites whose values lie within every (low, high) range; missing values never match
+        mask = np.ones(len(self.ids), dtype=bool)
+        for name, (low, high) in ranges.items():
+            values = self.columns[name]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+    def order(self, sort):
+        # Positions sorted by [(column, descending)], missing values last, then by id
+        def build():
+            # lexsort treats its last key as the primary one and is stable, so ties keep id order
+            keys = [-self.columns[name] if descending else self.columns[name] for name, descending in reversed(sort)]
+            return np.lexsort(keys)
+
+        return self._orders.get_or_set(tuple(sort), build)
+
+    def query(self, ranges, sort, candidates=None, ranked=False):
+        # -> website ids matching `ranges`, ordered by `sort` (or by id). `candidates` limits
+        # the result to these ids (from the SQL filters); with `ranked` and no sort, their
+        # order (search rank) is kept.
+        mask = self.mask(ranges)
+        if candidates is not None:
+            positions, found = self.positions(candidates)
+            positions = positions[found]
+            if ranked and not sort:
+                return self.ids[positions[mask[positions]]]
+            allowed = np.zeros(len(self.ids), dtype=bool)
+            allowed[positions] = True
+            mask &= allowed
+        if sort:
+            order = self.order(sort)
+            return self.ids[order[mask[order]]]
+        return self.ids[mask]
+
+    def values(self, website_ids):
+        # -> {website_id: {column: value or None}}
+        positions, found = self.positions(website_ids)
+        result = {}
+        for website_id, position, present in zip(website_ids, positions, found):
+            if present:
+                result[website_id] = {
+                    name: (None if np.isnan(values[position]) else float(values[position]))
+                    for name, values in self.columns.items()
+                }
+        return result
+
+    def replace(self, website_ids, ids, columns):
+        # New snapshot with these websites re-read: (ids, columns) as returned by _read_columns,
+        # website_ids missing from them are dropped
+        keep = ~np.isin(self.ids, np.asarray(list(website_ids), dtype='int64'))
+        merged_ids = np.concatenate([self.ids[keep], ids])
+        order = np.argsort(merged_ids, kind='stable')
+        return CatalogueSnapshot(merged_ids[order], {
+            name: np.concatenate([values[keep], columns[name]])[order] for name, values in self.columns.items()
+        })
+
+
+def _matrix(rows, width):
+    # Result rows -> float64 array of shape (len(rows), width), NaN for NULL. Plain tuples,
+    # as numpy probes Row objects for array attributes one lookup at a time.
+    return np.array([tuple(row) for row in rows], dtype='float64').reshape(len(rows), width)
+
+
+def _read_columns(websites, restrict):
+    # websites: [(id, count_review)] in id order; restrict(column) limits the child tables
+    # to the same websites. -> (ids, {column: values})
+    websites = _matrix(websites, 2)
+    ids = websites[:, 0].astype('int64')
+    columns = {name: np.full(len(ids), np.nan) for name in SNAPSHOT_COLUMNS}
+    columns['count_review'] = websites[:, 1].copy()
+    if not len(ids):
+        return ids, columns
+    snapshot = CatalogueSnapshot(ids, columns)
+
+    # Numeric(12,2) read as Float, so rows never become Decimal objects
+    seo = _matrix(db.session.execute(
+        select(WebsiteSEOMetric.website_id, *[type_coerce(getattr(WebsiteSEOMetric, name), db.Float) for name in SEO_COLUMNS])
+        .where(restrict(WebsiteSEOMetric.website_id)).order_by(WebsiteSEOMetric.website_id, WebsiteSEOMetric.id)
+    ).all(), len(SEO_COLUMNS) + 1)
+    if len(seo):
+        # First row per website
+        _, first = np.unique(seo[:, 0], return_index=True)
+        seo = seo[first]
+        positions, found = snapshot.positions(seo[:, 0])
+        for i, name in enumerate(SEO_COLUMNS, 1):
+            columns[name][positions[found]] = seo[found, i]
+
+    prices = _matrix(db.session.execute(
+        select(WebsitePrice.website_id, type_coerce(func.min(WebsitePrice.price_publication), db.Float))
+        .where(restrict(WebsitePrice.website_id)).group_by(WebsitePrice.website_id)
+    ).all(), 2)
+    if len(prices):
+        positions, found = snapshot.positions(prices[:, 0])
+        columns['price'][positions[found]] = prices[found, 1]
+    return ids, columns
+
+
+def load_snapshot(chunk_size=50000):
+    # Whole catalogue, read in id windows of chunk_size websites (3 queries per window)
+    parts, last_id = [], 0
+    while True:
+        websites = db.session.execute(select(Website.id, Website.count_review).where(Website.id > last_id)
+                                      .order_by(Website.id).limit(chunk_size)).all()
+        if not websites:
+            break
+        low, high = websites[0][0], websites[-1][0]
+        parts.append(_read_columns(websites, lambda column: column.between(low, high)))
+        last_id = high
+    if not parts:
+        return CatalogueSnapshot(np.empty(0, dtype='int64'), {name: np.empty(0) for name in SNAPSHOT_COLUMNS})
+    return CatalogueSnapshot(np.concatenate([ids for ids, _ in parts]), {
+        name: np.concatenate([columns[name] for _, columns in parts]) for name in SNAPSHOT_COLUMNS
+    })
+
+
+def parse_ranges(args):
+    # min_<column>= / max_<column>= parameters -> {column: (low, high)}. Raises ValueError.
+    ranges = {}
+    for key, value in args.items():
+        bound, _, name = key.partition('_')
+        if bound not in ('min', 'max') or value in (None, ''):
+            continue
+        if name not in SNAPSHOT_COLUMNS:
+            raise ValueError(f"Unknown filter: {key}. Filterable: {', '.join(SNAPSHOT_COLUMNS)}")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be a number")
+        low, high = ranges.get(name, (None, None))
+        ranges[name] = (number, high) if bound == 'min' else (low, number)
+    return ranges
+
+
+def parse_sort(value):
+    # "price,-ahrefs_dr" -> [('price', False), ('ahrefs_dr', True)]. Raises ValueError.
+    sort = []
+    for key in (value or '').split(','):
+        key = key.strip()
+        if not key:
+            continue
+        name = key.lstrip('-')
+        if name not in SNAPSHOT_COLUMNS:
+            raise ValueError(f"Unknown sort: {name}. Sortable: {', '.join(SNAPSHOT_COLUMNS)}")
+        sort.append((name, key.startswith('-')))
+    return sort
+
+
+def filter_metrics_sql(query, ranges):
+    # The same ranges as SQL conditions on a Website query, for callers that stream rows
+    # (the export) rather than page through the snapshot
+    for name, (low, high) in ranges.items():
+        if name == 'price':
+            price = func.min(WebsitePrice.price_publication)
+            having = [price >= low] if low is not None else []
+            having += [price <= high] if high is not None else []
+            query = query.filter(Website.id.in_(
+                db.session.query(WebsitePrice.website_id).group_by(WebsitePrice.website_id).having(*having)
+            ))
+            continue
+        column = Website.count_review if name == 'count_review' else getattr(WebsiteSEOMetric, name)
+        conditions = [column >= low] if low is not None else []
+        conditions += [column <= high] if high is not None else []
+        if name == 'count_review':
+            query = query.filter(*conditions)
+        else:
+            query = query.filter(Website.id.in_(db.session.query(WebsiteSEOMetric.website_id).filter(*conditions)))
+    return query
+
+
+def sort_metrics_sql(query, sort):
+    # The snapshot's order as SQL: [(column, descending)] with missing values last, then
+    # by id. Replaces any ordering already on the query (search rank included).
+    if not sort:
+        return query
+    order_by = []
+    for name, descending in sort:
+        if name == 'price':
+            column = (select(func.min(WebsitePrice.price_publication))
+                      .where(WebsitePrice.website_id == Website.id).scalar_subquery())
+        elif name == 'count_review':
+            column = Website.count_review
+        else:
+            # The website's first website_seo_metrics row, as in load_snapshot()
+            column = (select(getattr(WebsiteSEOMetric, name)).where(WebsiteSEOMetric.website_id == Website.id)
+                      .order_by(WebsiteSEOMetric.id).limit(1).scalar_subquery())
+        order_by += [column.is_(None), column.desc() if descending else column]
+    return query.order_by(None).order_by(*order_by, Website.id)
+
+
+_snapshot = None
+_refresh_lock = threading.Lock()
+_refresher = None
+
+
+def refresh_snapshot():
+    global _snapshot
+    with _refresh_lock:
+        _snapshot = load_snapshot()
+    return _snapshot
+
+
+def apply_snapshot_changes(website_ids):
+    # Re-read just these websites into an already built snapshot (edits and deletes included)
+    global _snapshot
+    if _snapshot is None:
+        return
+    website_ids = sorted(set(website_ids))
+    with _refresh_lock:
+        websites = db.session.execute(select(Website.id, Website.count_review).where(Website.id.in_(website_ids))
+                                      .order_by(Website.id)).all()
+        ids, columns = _read_columns(websites, lambda column: column.in_(website_ids))
+        _snapshot = _snapshot.replace(website_ids, ids, columns)
+
+
+def _refresh_loop(app):
+    while True:
+        time.sleep(app.config['SNAPSHOT_REFRESH_INTERVAL'])
+        try:
+            with app.app_context():
+                refresh_snapshot()
+                db.session.remove()
+        except Exception as e:
+            print(f"Error refreshing catalogue snapshot: {e}")
+
+
+def get_snapshot(app):
+    # Built on first use; afterwards a daemon thread rebuilds it every
+    # SNAPSHOT_REFRESH_INTERVAL seconds. Websites changed by `flask ingest` are patched in
+    # between rebuilds through invalidate_catalogue().
+    global _snapshot, _refresher
+    if _snapshot is None:
+        with _refresh_lock:
+            if _snapshot is None:
+                _snapshot = load_snapshot()
+    if _refresher is None:
+        with _refresh_lock:
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, args=(app,), daemon=True)
+                _refresher.start()
+    return _snapshot
@@ -0,0 +1,375 @@
+import os
+import time
+
+from flask import Blueprint, current_app, render_template, request, jsonify, send_file, stream_with_context, url_for
+from sqlalchemy import or_, case
+
+from countries import website_country_starts_with, website_in_country
+from exports import (COLUMNAR_FORMATS, EXPORT_FORMATS, ExportDependencyError, build_frame, export_columns,
+                     export_rows, write_columnar)
+from facets import get_facets
+from factory import conditional_response
+from models import db, Website, WebsiteCategory
+from pagination import Page, count_total, decode_cursor, encode_cursor, paginate_keyset, paginate_offset
+from search import get_search_index
+
+bp = Blueprint('ui', __name__)
+
+# Define available columns for the table view
+AVAILABLE_COLUMNS = {
+    'name': 'Website Name',
+    'url': 'URL',
+    'countries': 'Countries',
+    'language': 'Language',
+    'rating_text': 'Rating',
+    'count_review': 'Review Count',
+    'domain_age': 'Domain Age',
+    'domain_zone': 'Domain Zone',
+    'speed': 'Speed',
+    'amount_total_deals': 'Total Deals'
+}
+
+# Sort dropdown on /websites (any snapshot column works as ?sort=)
+SORT_OPTIONS = {
+    '': 'Default',
+    'price': 'Price: low to high',
+    '-price': 'Price: high to low',
+    '-ahrefs_dr': 'Ahrefs DR',
+    '-ahrefs_traffic': 'Ahrefs traffic',
+    '-da_moz': 'Moz DA',
+    '-count_review': 'Reviews',
+}
+
+def filter_websites(query, args):
+    # Filters shared by the list view and the export
+    search = args.get('search', '')
+    if search:
+        # Name/url matches come from the search index, ranked best first
+        ids, truncated = [], True
+        if current_app.config['SEARCH_INDEX_ENABLED']:
+            ids, truncated = get_search_index(current_app._get_current_object()).search(
+                search, limit=current_app.config['SEARCH_MAX_RESULTS']
+            )
+
+        if truncated:
+            name_match = or_(Website.name.ilike(f'%{search}%'), Website.url.ilike(f'%{search}%'))
+        else:
+            name_match = Website.id.in_(ids)
+            if ids:
+                query = query.order_by(case({website_id: rank for rank, website_id in enumerate(ids)},
+                                            value=Website.id, else_=len(ids)))
+        # Ties (country-only matches, or no ranking at all) keep a stable page order
+        query = query.order_by(Website.id)
+
+        query = query.filter(or_(name_match, website_country_starts_with(search)))
+
+    # Filter by category if provided
+    category = args.get('category')
+    if category:
+        query = query.join(WebsiteCategory).filter(WebsiteCategory.category_name == category)
+
+    # Filter by country if provided (indexed lookup through website_countries)
+    country = args.get('country')
+    if country:
+        query = query.filter(website_in_country(country))
+
+    # Filter by language if provided
+    language = args.get('language')
+    if language:
+        query = query.filter(Website.language == language)
+
+    # Filter by announcement type
+    announcement_type = args.get('announcement_type')
+    if announcement_type == 'free':
+        query = query.filter(Website.is_free_announcement == True)
+    elif announcement_type == 'paid':
+        query = query.filter(Website.is_paid_announcement == True)
+
+    return query
+
+# filter_websites() parameters; the metric ones (min_*/max_*/sort) are answered from snapshot.py
+SQL_FILTERS = ('search', 'category', 'country', 'language', 'announcement_type')
+
+def metric_filters_requested(args):
+    # min_<column>=, max_<column>= or sort= with a value
+    return any(value for key, value in args.items() if key == 'sort' or key.startswith(('min_', 'max_')))
+
+def query_snapshot(args, page, per_page):
+    # Metric range filters and sorts from the in-process snapshot (numpy is imported only here).
+    # The SQL filters, if any, narrow it to the matching ids first. Raises ValueError for
+    # bad parameters. -> (Page with exact total, snapshot)
+    from snapshot import get_snapshot, parse_ranges, parse_sort
+
+    ranges, sort = parse_ranges(args), parse_sort(args.get('sort'))
+    snapshot = get_snapshot(current_app._get_current_object())
+    candidates = None
+    if any(args.get(key) for key in SQL_FILTERS):
+        candidates = [row[0] for row in filter_websites(db.session.query(Website.id), args).all()]
+    ids = snapshot.query(ranges, sort, candidates, ranked=bool(args.get('search')))
+
+    page = max(page, 1)
+    page_ids = ids[(page - 1) * per_page:page * per_page].tolist()
+    rows = {website.id: website for website in Website.query.filter(Website.id.in_(page_ids)).all()} if page_ids else {}
+    websites = Page([rows[website_id] for website_id in page_ids if website_id in rows], per_page, page=page,
+                    has_prev=page > 1, has_next=len(ids) > page * per_page)
+    websites.total = len(ids)
+    return websites, snapshot
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+@bp.route('/websites')
+def website_list():
+    # Check if this is an export request
+    if request.args.get('export'):
+        return website_export()
+
+    # Get filter parameters
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    search = request.args.get('search', '')
+
+    # Get selected columns for table view
+    selected_columns = request.args.getlist('columns')
+    if not selected_columns:
+        selected_columns = ['name', 'url', 'countries', 'language']  # Default columns
+
+    per_page = min(max(per_page, 1), 100)
+    if metric_filters_requested(request.args):
+        # Metric ranges and sorts always use page numbers; the snapshot makes deep pages cheap
+        # Bad parameters render the page with the message; /api/websites/query answers in JSON
+        if not current_app.config['SNAPSHOT_ENABLED']:
+            return render_website_list(Page([], per_page, page=page), selected_columns, search,
+                                       error='Metric filters are disabled (SNAPSHOT_ENABLED)'), 400
+        try:
+            websites, _ = query_snapshot(request.args, page, per_page)
+        except ValueError as e:
+            return render_website_list(Page([], per_page, page=page), selected_columns, search, error=str(e)), 400
+        return render_website_list(websites, selected_columns, search)
+
+    # Build query with filters
+    query = filter_websites(Website.query, request.args)
+
+    # Get paginated results. Page numbers (OFFSET) are kept for shallow pages; past
+    # PAGINATION_MAX_OFFSET_PAGE the Next link switches to a keyset cursor on websites.id.
+    # Ranked search results keep their rank order and always use page numbers.
+    cursor = None if search else decode_cursor(request.args.get('cursor'))
+    if cursor:
+        websites = paginate_keyset(query, Website.id, per_page, cursor)
+    else:
+        if not search:
+            query = query.order_by(Website.id)
+        websites = paginate_offset(query, page, per_page)
+        if not search and websites.has_next and page >= current_app.config['PAGINATION_MAX_OFFSET_PAGE']:
+            websites.next_cursor = encode_cursor('after', websites.items[-1].id)
+
+    count_mode = request.args.get('count', current_app.config['PAGINATION_COUNT_MODE'])
+    websites.total, websites.total_is_estimate = count_total(
+        query, count_mode, current_app.config['PAGINATION_ESTIMATE_CAP']
+    )
+    return render_website_list(websites, selected_columns, search)
+
+def render_website_list(websites, selected_columns, search, error=None):
+    # Filter dropdown values come from the in-process facet cache
+    facets = get_facets()
+
+    # Remove 'page' and 'cursor' from request.args for safe pagination links
+    request_args_no_page = {k: v for k, v in request.args.items() if k not in ('page', 'cursor')}
+    return render_template('website_list.html',
+                         websites=websites,
+                         categories=facets['categories'],
+                         countries=facets['countries'],
+                         languages=facets['languages'],
+                         available_columns=AVAILABLE_COLUMNS,
+                         selected_columns=selected_columns,
+                         search=search,
+                         sort_options=SORT_OPTIONS,
+                         request_args_no_page=request_args_no_page,
+                         error=error)
+
+@bp.route('/website/<int:website_id>')
+def website_detail(website_id):
+    response_cache = current_app.extensions['response_cache']
+    cache_key = f'detail:{website_id}'
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        # Load the website and all child tables up front (8 queries regardless of row counts)
+        website = Website.preloaded().filter(Website.id == website_id).first_or_404()
+        entry = response_cache.set(cache_key, render_template('website_detail.html', website=website))
+    return conditional_response(*entry, 'text/html')
+
+@bp.route('/websites/export')
+def website_export():
+    # Build query with filters (same as website_list)
+    query = filter_websites(Website.query, request.args)
+    if metric_filters_requested(request.args):
+        # Metric ranges and sort= as SQL, so the export streams without the snapshot
+        from snapshot import filter_metrics_sql, parse_ranges, parse_sort, sort_metrics_sql
+
+        try:
+            query = filter_metrics_sql(query, parse_ranges(request.args))
+            query = sort_metrics_sql(query, parse_sort(request.args.get('sort')))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e), "code": 400}), 400
+
+    # Only the selected columns are read, streamed in EXPORT_CHUNK_SIZE rows at a time
+    columns = export_columns(request.args.getlist('columns'))
+    chunk_size = current_app.config['EXPORT_CHUNK_SIZE']
+
+    # Handle different export formats
+    export_format = request.args.get('export', 'csv')
+
+    # Columnar formats are built as a typed DataFrame (pandas is imported only here);
+    # include=seo / include=prices add the numeric SEO metrics and per-website price aggregates
+    if export_format in COLUMNAR_FORMATS:
+        mimetype, extension = COLUMNAR_FORMATS[export_format]
+        try:
+            frame = build_frame(query, columns, request.args.getlist('include'), chunk_size)
+            output = write_columnar(frame, export_format)
+        except ExportDependencyError as e:
+            return jsonify({"status": "error", "message": str(e), "code": 501}), 501
+        return current_app.response_class(
+            response=output,
+            status=200,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=websites_export.{extension}'}
+        )
+
+    rows = export_rows(query, columns, chunk_size)
+    writer, mimetype, extension = EXPORT_FORMATS.get(export_format, EXPORT_FORMATS['csv'])
+    headers = {}
+    if extension != 'json':
+        headers['Content-Disposition'] = f'attachment; filename=websites_export.{extension}'
+
+    return current_app.response_class(
+        stream_with_context(writer(rows, columns, chunk_size)),
+        status=200,
+        mimetype=mimetype,
+        headers=headers
+    )
+
+@bp.route('/websites/export/jobs', methods=['POST'])
+def export_job_submit():
+    # Runs a /websites/export in a background worker. Takes the same parameters (query
+    # string, form or a JSON object); identical requests share one job until the data changes.
+    body = request.get_json(silent=True) if request.is_json else None
+    if isinstance(body, dict):
+        items = [(key, value) for key, values in body.items()
+                 for value in (values if isinstance(values, list) else [values])]
+    else:
+        items = list(request.args.items(multi=True)) + list(request.form.items(multi=True))
+
+    params = dict(items)
+    export_format = params.get('export') or 'csv'
+    if export_format not in EXPORT_FORMATS and export_format not in COLUMNAR_FORMATS:
+        formats = ', '.join(list(EXPORT_FORMATS) + list(COLUMNAR_FORMATS))
+        return jsonify({"status": "error", "message": f"Unknown export format: {export_format}. Available: {formats}", "code": 400}), 400
+    if metric_filters_requested(params):
+        from snapshot import parse_ranges
+
+        try:
+            parse_ranges(params)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e), "code": 400}), 400
+
+    job, created = current_app.extensions['export_jobs'].submit(items)
+    response = export_job_response(job)
+    if job['status'] == 'done':
+        return response
+    response.status_code = 202
+    response.headers['Location'] = url_for('ui.export_job_status', job_id=job['id'])
+    return response
+
+@bp.route('/websites/export/jobs/<job_id>')
+def export_job_status(job_id):
+    job = current_app.extensions['export_jobs'].get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Export job not found", "code": 404}), 404
+    return export_job_response(job)
+
+@bp.route('/websites/export/jobs/<job_id>/download')
+def export_job_download(job_id):
+    # The finished file, with Range and If-Range support so interrupted downloads resume
+    export_jobs = current_app.extensions['export_jobs']
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Export job not found", "code": 404}), 404
+    if job['status'] != 'done':
+        return jsonify({"status": "error", "message": f"Export job is {job['status']}", "code": 409}), 409
+    path = export_jobs.file_path(job)
+    if not os.path.exists(path):
+        return jsonify({"status": "error", "message": "Export file has expired", "code": 410}), 410
+    return send_file(path, mimetype=job['mimetype'], as_attachment=True, download_name=job['filename'],
+                     conditional=True, etag=job['id'], max_age=current_app.config['EXPORT_JOB_TTL'])
+
+def export_job_response(job):
+    data = {
+        'id': job['id'],
+        'status': job['status'],
+        'params': job['params'],
+        'created_at': job['created_at'],
+        'status_url': url_for('ui.export_job_status', job_id=job['id']),
+    }
+    if job['status'] == 'done':
+        data.update(size=job['size'], filename=job['filename'], finished_at=job['finished_at'],
+                    download_url=url_for('ui.export_job_download', job_id=job['id']))
+    elif job['status'] == 'failed':
+        data['error'] = job['error']
+    return jsonify(data)
+
+@bp.route('/api/search/suggest')
+def api_search_suggest():
+    # Typeahead for the search box, served from the in-process index
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    suggestions = []
+    if query and current_app.config['SEARCH_INDEX_ENABLED']:
+        suggestions = get_search_index(current_app._get_current_object()).suggest(query, limit)
+    return jsonify({'query': query, 'suggestions': suggestions})
+
+@bp.route('/api/websites/query', methods=['GET', 'POST'])
+def api_websites_query():
+    # Metric range filters, sorts and pages as JSON. GET takes the /websites parameters;
+    # POST takes {"filters": {"ahrefs_dr": {"min": 50}, "price": {"max": 200}},
+    # "sort": ["price", "-ahrefs_dr"], "page": 1, "per_page": 50} plus any of SQL_FILTERS.
+    if not current_app.config['SNAPSHOT_ENABLED']:
+        return jsonify({"status": "error", "message": "Metric queries are disabled (SNAPSHOT_ENABLED)", "code": 503}), 503
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('filters', {}), dict):
+            return jsonify({"status": "error", "message": "Expected a JSON object", "code": 400}), 400
+        args = {key: body[key] for key in SQL_FILTERS if body.get(key)}
+        for name, bounds in body.get('filters', {}).items():
+            for bound in ('min', 'max'):
+                if isinstance(bounds, dict) and bounds.get(bound) is not None:
+                    args[f'{bound}_{name}'] = bounds[bound]
+        sort = body.get('sort') or []
+        args['sort'] = ','.join(map(str, sort)) if isinstance(sort, list) else str(sort)
+        page, per_page = body.get('page', 1), body.get('per_page', 20)
+    else:
+        args = request.args
+        page, per_page = request.args.get('page', 1, type=int), request.args.get('per_page', 20, type=int)
+
+    try:
+        page, per_page = int(page), min(max(int(per_page), 1), 100)
+        websites, snapshot = query_snapshot(args, page, per_page)
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e), "code": 400}), 400
+
+    metrics = snapshot.values([website.id for website in websites.items])
+    return jsonify({
+        'total': websites.total,
+        'page': websites.page,
+        'per_page': per_page,
+        'pages': websites.pages,
+        'snapshot_age': round(time.monotonic() - snapshot.built_at, 1),
+        'items': [{
+            'id': website.id,
+            'name': website.name,
+            'url': website.url,
+            'language': website.language,
+            'countries': website.countries,
+            'metrics': metrics.get(website.id, {}),
+        } for website in websites.items],
+    })